@@ -1,29 +1,31 @@
 from typing import TypedDict, Literal
 from langgraph.graph import StateGraph, END
-from openai import OpenAI
-import requests
-from PIL import Image, ImageDraw, ImageFont
-import io
+from langgraph.types import interrupt
+from llm_cache import flyer_gateway as gateway
+from flyer_assets import persist
+from flyer_checkpoints import checkpointer, run_cli
+from flyer_fonts import get_font, warm_up
+from flyer_layers import compositor, image_layer, text_block_layer
 import numpy as np
 import cv2
-import uuid
 
-client = OpenAI()
+# Canvas size of the final flyer, the size requested from DALL-E
+FLYER_SIZE = (1024, 1024)
 
 class FlyerState(TypedDict):
     input_description: str
     plan: str
-    image: str
+    image: str  # file:// URL of the generated image in the asset cache
     image_feedback: str
     image_approved: bool
     text: dict
     text_feedback: str
     text_approved: bool
-    final_flyer: np.ndarray
+    final_flyer: bytes  # PNG, so the checkpoint can store it
 
-def planner_agent(state: FlyerState) -> FlyerState:
+def planner_agent(state: FlyerState) -> dict:
     print("🛠️ Planning flyer strategy...")
-    response = client.chat.completions.create(
+    response = gateway.chat_sync(
         model="gpt-4-turbo",
         messages=[{
             "role": "system",
@@ -33,10 +35,9 @@ def planner_agent(state: FlyerState) -> FlyerState:
             "content": state["input_description"]
         }]
     )
-    state["plan"] = response.choices[0].message.content
-    return state
+    return {"plan": response}
 
-def image_generator_agent(state: FlyerState) -> FlyerState:
+def image_generator_agent(state: FlyerState) -> dict:
     print("🎨 Generating flyer image...")
     messages = [{
         "role": "system",
@@ -52,22 +53,22 @@ def image_generator_agent(state: FlyerState) -> FlyerState:
             "content": f"Human feedback: {state['image_feedback']}"
         })
     
-    prompt_response = client.chat.completions.create(
+    image_prompt = gateway.chat_sync(
         model="gpt-4-turbo",
         messages=messages
     )
-    image_prompt = prompt_response.choices[0].message.content
     
-    image_response = client.images.generate(
+    image_url = gateway.image_sync(
         model="dall-e-3",
         prompt=image_prompt,
         size="1024x1024",
         quality="hd"
     )
-    state["image"] = image_response.data[0].url
-    return state
+    # DALL-E URLs expire within hours, long before a late approval resumes the
+    # graph; checkpoint a local copy instead
+    return {"image": persist(image_url)}
 
-def text_analyser_agent(state: FlyerState) -> FlyerState:
+def text_analyser_agent(state: FlyerState) -> dict:
     print("📝 Analyzing text content...")
     messages = [{
         "role": "system",
@@ -83,74 +84,54 @@ def text_analyser_agent(state: FlyerState) -> FlyerState:
             "content": f"Human feedback: {state['text_feedback']}"
         })
     
-    response = client.chat.completions.create(
+    response = gateway.chat_sync(
         model="gpt-4-turbo",
         messages=messages,
         response_format={"type": "json_object"}
     )
-    state["text"] = eval(response.choices[0].message.content)
-    return state
-
-def image_approval_node(state: FlyerState) -> FlyerState:
-    print("\n=== IMAGE APPROVAL ===")
-    print(f"Generated Image URL: {state['image']}")
-    print("Please review the image above (open URL in browser)")
-    
-    approval = input("Approve this image? (Y/N): ").strip().upper()
-    if approval == 'Y':
-        state["image_approved"] = True
-    else:
-        state["image_approved"] = False
-        state["image_feedback"] = input("Enter your feedback for improvement: ")
-    
-    return state
-
-def text_approval_node(state: FlyerState) -> FlyerState:
-    print("\n=== TEXT APPROVAL ===")
-    print(f"Headline: {state['text']['headline']}")
-    print(f"Subtext: {state['text']['subtext']}")
-    print(f"Position: {state['text']['position']}")
-    
-    approval = input("Approve this text? (Y/N): ").strip().upper()
-    if approval == 'Y':
-        state["text_approved"] = True
-    else:
-        state["text_approved"] = False
-        state["text_feedback"] = input("Enter your feedback for improvement: ")
-    
-    return state
-
-def flyer_agent(state: FlyerState) -> FlyerState:
+    return {"text": eval(response)}
+
+# Approvals are interrupts: the run stops here with its state checkpointed
+# and resumes from the checkpoint once a reviewer answers (see flyer_checkpoints)
+def image_approval_node(state: FlyerState) -> dict:
+    decision = interrupt({
+        "kind": "image",
+        "image": state["image"],
+        "note": "Please review the image above (open URL in browser)"
+    })
+    if decision["approved"]:
+        return {"image_approved": True, "image_feedback": ""}
+    return {"image_approved": False, "image_feedback": decision.get("feedback", "")}
+
+def text_approval_node(state: FlyerState) -> dict:
+    decision = interrupt({
+        "kind": "text",
+        "headline": state["text"]["headline"],
+        "subtext": state["text"]["subtext"],
+        "position": state["text"]["position"]
+    })
+    if decision["approved"]:
+        return {"text_approved": True, "text_feedback": ""}
+    return {"text_approved": False, "text_feedback": decision.get("feedback", "")}
+
+def flyer_agent(state: FlyerState) -> dict:
     print("🖼️ Composing final flyer...")
-    response = requests.get(state["image"])
-    img = Image.open(io.BytesIO(response.content)).convert("RGB")
-    draw = ImageDraw.Draw(img)
-    
     # Font setup and text positioning
-    headline_font = ImageFont.truetype("arialbd.ttf", 72) if "arialbd.ttf" else ImageFont.load_default()
-    subtext_font = ImageFont.truetype("arial.ttf", 48) if "arial.ttf" else ImageFont.load_default()
+    headline_font = get_font("arialbd.ttf", 72)
+    subtext_font = get_font("arial.ttf", 48)
     
-    position = state["text"]["position"]
-    positions = {
-        "top-left": (100, 100),
-        "top-center": (img.width//2, 100),
-        "center": (img.width//2, img.height//2),
-        "bottom-center": (img.width//2, img.height-150)
-    }
-    x, y = positions.get(position, (100, 100))
+    # Image and text are cached layers: a text-only revision reuses the
+    # composited image and redraws just the text
+    img = compositor.compose(FLYER_SIZE, [
+        image_layer(state["image"]),
+        text_block_layer([
+            (state["text"]["headline"], headline_font),
+            (state["text"]["subtext"], subtext_font)
+        ], state["text"]["position"]),
+    ])
     
-    # Draw text elements
-    for idx, (text, font) in enumerate([
-        (state["text"]["headline"], headline_font),
-        (state["text"]["subtext"], subtext_font)
-    ]):
-        bbox = draw.textbbox((x, y), text, font=font)
-        draw.rectangle(bbox, fill=(0, 0, 0, 128))
-        draw.text((x, y), text, font=font, fill="white")
-        y += bbox[3] - bbox[1] + 20
-    
-    state["final_flyer"] = cv2.cvtColor(np.array(img), cv2.COLOR_RGB2BGR)
-    return state
+    _, png = cv2.imencode(".png", cv2.cvtColor(np.array(img), cv2.COLOR_RGB2BGR))
+    return {"final_flyer": png.tobytes()}
 
 def check_approvals(state: FlyerState) -> Literal["generate_flyer", "wait"]:
     if state.get("image_approved", False) and state.get("text_approved", False):
@@ -166,7 +147,7 @@ workflow.add_node("image_gen", image_generator_agent)
 workflow.add_node("text_analyser", text_analyser_agent)
 workflow.add_node("image_approval", image_approval_node)
 workflow.add_node("text_approval", text_approval_node)
-workflow.add_node("check_approvals", check_approvals)
+workflow.add_node("check_approvals", lambda state: {})
 workflow.add_node("flyer", flyer_agent)
 
 # Set up edges
@@ -187,23 +168,18 @@ workflow.add_conditional_edges(
 
 workflow.add_conditional_edges(
     "check_approvals",
-    lambda s: "flyer" if s.get("image_approved") and s.get("text_approved") else END,
+    check_approvals,
     {"generate_flyer": "flyer", "wait": END}
 )
 
 workflow.add_edge("flyer", END)
 workflow.set_entry_point("planner")
 
-app = workflow.compile()
+# Checkpointed after every node, so finished work survives restarts
+app = workflow.compile(checkpointer=checkpointer())
 
 # Execute
 if __name__ == "__main__":
-    inputs = {"input_description": "Tech conference for AI developers"}
-    result = app.invoke(inputs)
-    
-    if "final_flyer" in result:
-        output_path = f"final_flyer_{uuid.uuid4()}.png"
-        cv2.imwrite(output_path, result["final_flyer"])
-        print(f"✅ Final flyer saved to {output_path}")
-    else:
-        print("❌ Flyer creation process incomplete")
+    # Parse the flyer fonts before the first render
+    warm_up([("arialbd.ttf", 72), ("arial.ttf", 48)])
+    run_cli(app, "Tech conference for AI developers")
@@ -1,14 +1,16 @@
 from typing import TypedDict, Literal
 from langgraph.graph import StateGraph, END
-from openai import OpenAI
-import requests
-from PIL import Image, ImageDraw, ImageFont
-import io
+from langgraph.types import interrupt
+from llm_cache import flyer_gateway as gateway
+from flyer_assets import persist
+from flyer_checkpoints import checkpointer, run_cli
+from flyer_fonts import get_font, warm_up
+from flyer_layers import compositor, image_layer, text_block_layer
 import numpy as np
 import cv2
-import uuid
 
-client = OpenAI()
+# Canvas size of the final flyer, the size requested from DALL-E
+FLYER_SIZE = (1024, 1024)
 
 class FlyerState(TypedDict):
     # State components
@@ -16,16 +18,16 @@ class FlyerState(TypedDict):
     plan: str
     plan_approved: bool
     plan_feedback: str
-    image: str
+    image: str  # file:// URL of the generated image in the asset cache
     image_approved: bool
     image_feedback: str
     text: dict
     text_approved: bool
     text_feedback: str
-    final_flyer: np.ndarray
+    final_flyer: bytes  # PNG, so the checkpoint can store it
 
 # 1️⃣ Planner Agent with Feedback Loop
-def planner_agent(state: FlyerState) -> FlyerState:
+def planner_agent(state: FlyerState) -> dict:
     print("\n🔧 Generating/Refining Plan...")
     messages = [
         {"role": "system", "content": "Expert flyer designer creating detailed plans"},
@@ -35,29 +37,22 @@ def planner_agent(state: FlyerState) -> FlyerState:
     if state.get("plan_feedback"):
         messages.append({"role": "user", "content": f"Feedback: {state['plan_feedback']}"})
     
-    response = client.chat.completions.create(
+    response = gateway.chat_sync(
         model="gpt-4-turbo",
         messages=messages
     )
-    state["plan"] = response.choices[0].message.content
-    return state
+    return {"plan": response}
 
-def plan_approval(state: FlyerState) -> FlyerState:
-    print("\n=== PLAN APPROVAL ===")
-    print(f"Generated Plan:\n{state['plan']}")
-    approval = input("Approve this plan? (Y/N): ").strip().upper()
-    
-    if approval == 'Y':
-        state["plan_approved"] = True
-        state["plan_feedback"] = ""
-    else:
-        state["plan_approved"] = False
-        state["plan_feedback"] = input("Enter your improvement feedback: ")
-    
-    return state
+# Approvals are interrupts: the run stops with its state checkpointed and
+# resumes from the checkpoint once a reviewer answers (see flyer_checkpoints)
+def plan_approval(state: FlyerState) -> dict:
+    decision = interrupt({"kind": "plan", "plan": state["plan"]})
+    if decision["approved"]:
+        return {"plan_approved": True, "plan_feedback": ""}
+    return {"plan_approved": False, "plan_feedback": decision.get("feedback", "")}
 
 # 2️⃣ Image Generator with Feedback
-def image_generator_agent(state: FlyerState) -> FlyerState:
+def image_generator_agent(state: FlyerState) -> dict:
     print("\n🎨 Generating/Refining Image...")
     messages = [
         {"role": "system", "content": "Create DALL-E prompts from plans"},
@@ -67,37 +62,29 @@ def image_generator_agent(state: FlyerState) -> FlyerState:
     if state.get("image_feedback"):
         messages.append({"role": "user", "content": f"Feedback: {state['image_feedback']}"})
     
-    prompt_response = client.chat.completions.create(
+    image_prompt = gateway.chat_sync(
         model="gpt-4-turbo",
         messages=messages
     )
-    image_prompt = prompt_response.choices[0].message.content
     
-    image_response = client.images.generate(
+    image_url = gateway.image_sync(
         model="dall-e-3",
         prompt=image_prompt,
         size="1024x1024",
         quality="hd"
     )
-    state["image"] = image_response.data[0].url
-    return state
+    # DALL-E URLs expire within hours, long before a late approval resumes the
+    # graph; checkpoint a local copy instead
+    return {"image": persist(image_url)}
 
-def image_approval(state: FlyerState) -> FlyerState:
-    print("\n=== IMAGE APPROVAL ===")
-    print(f"Image URL: {state['image']}")
-    approval = input("Approve this image? (Y/N): ").strip().upper()
-    
-    if approval == 'Y':
-        state["image_approved"] = True
-        state["image_feedback"] = ""
-    else:
-        state["image_approved"] = False
-        state["image_feedback"] = input("Enter image improvement feedback: ")
-    
-    return state
+def image_approval(state: FlyerState) -> dict:
+    decision = interrupt({"kind": "image", "image": state["image"]})
+    if decision["approved"]:
+        return {"image_approved": True, "image_feedback": ""}
+    return {"image_approved": False, "image_feedback": decision.get("feedback", "")}
 
 # 3️⃣ Text Analyzer with Feedback
-def text_analyser_agent(state: FlyerState) -> FlyerState:
+def text_analyser_agent(state: FlyerState) -> dict:
     print("\n📝 Generating/Refining Text...")
     messages = [
         {"role": "system", "content": "Generate JSON text elements"},
@@ -107,45 +94,41 @@ def text_analyser_agent(state: FlyerState) -> FlyerState:
     if state.get("text_feedback"):
         messages.append({"role": "user", "content": f"Feedback: {state['text_feedback']}"})
     
-    response = client.chat.completions.create(
+    response = gateway.chat_sync(
         model="gpt-4-turbo",
         messages=messages,
         response_format={"type": "json_object"}
     )
-    state["text"] = eval(response.choices[0].message.content)
-    return state
-
-def text_approval(state: FlyerState) -> FlyerState:
-    print("\n=== TEXT APPROVAL ===")
-    print(f"Headline: {state['text']['headline']}")
-    print(f"Subtext: {state['text']['subtext']}")
-    approval = input("Approve this text? (Y/N): ").strip().upper()
-    
-    if approval == 'Y':
-        state["text_approved"] = True
-        state["text_feedback"] = ""
-    else:
-        state["text_approved"] = False
-        state["text_feedback"] = input("Enter text improvement feedback: ")
-    
-    return state
+    return {"text": eval(response)}
+
+def text_approval(state: FlyerState) -> dict:
+    decision = interrupt({
+        "kind": "text",
+        "headline": state["text"]["headline"],
+        "subtext": state["text"]["subtext"]
+    })
+    if decision["approved"]:
+        return {"text_approved": True, "text_feedback": ""}
+    return {"text_approved": False, "text_feedback": decision.get("feedback", "")}
 
 # 4️⃣ Final Composition
-def flyer_agent(state: FlyerState) -> FlyerState:
+def flyer_agent(state: FlyerState) -> dict:
     print("\n🖼️ Creating Final Flyer...")
-    # Image processing and text overlay logic
-    response = requests.get(state["image"])
-    img = Image.open(io.BytesIO(response.content)).convert("RGB")
-    draw = ImageDraw.Draw(img)
-    
     # Text positioning and rendering logic
-    headline_font = ImageFont.truetype("arialbd.ttf", 72) if "arialbd.ttf" else ImageFont.load_default()
-    subtext_font = ImageFont.truetype("arial.ttf", 48) if "arial.ttf" else ImageFont.load_default()
+    headline_font = get_font("arialbd.ttf", 72)
+    subtext_font = get_font("arial.ttf", 48)
     
-    # ... (text positioning and drawing logic)
+    # Cached layers: rejecting only the text redraws just the text layer
+    img = compositor.compose(FLYER_SIZE, [
+        image_layer(state["image"]),
+        text_block_layer([
+            (state["text"]["headline"], headline_font),
+            (state["text"]["subtext"], subtext_font)
+        ], state["text"].get("position", "top-left")),
+    ])
     
-    state["final_flyer"] = cv2.cvtColor(np.array(img), cv2.COLOR_RGB2BGR)
-    return state
+    _, png = cv2.imencode(".png", cv2.cvtColor(np.array(img), cv2.COLOR_RGB2BGR))
+    return {"final_flyer": png.tobytes()}
 
 # Conditional Routing Functions
 def route_plan(state: FlyerState) -> str:
@@ -166,7 +149,7 @@ workflow.add_node("image_gen", image_generator_agent)
 workflow.add_node("image_approval", image_approval)
 workflow.add_node("text_analyser", text_analyser_agent)
 workflow.add_node("text_approval", text_approval)
-workflow.add_node("check_approvals", route_components)
+workflow.add_node("check_approvals", lambda state: {})
 workflow.add_node("flyer", flyer_agent)
 
 # Set Up Edges
@@ -176,8 +159,9 @@ workflow.set_entry_point("planner")
 workflow.add_edge("planner", "plan_approval")
 workflow.add_conditional_edges(
     "plan_approval",
-    lambda s: "planner" if not s.get("plan_approved") else "image_gen",
-    {"planner": "planner", "image_gen": "image_gen"}
+    # An approved plan fans out to both generators
+    lambda s: "planner" if not s.get("plan_approved") else ["image_gen", "text_analyser"],
+    ["planner", "image_gen", "text_analyser"]
 )
 
 # Image Generation Loop
@@ -188,7 +172,6 @@ workflow.add_conditional_edges(
 )
 
 # Text Generation Loop
-workflow.add_edge("plan_approval", "text_analyser")
 workflow.add_edge("text_analyser", "text_approval")
 workflow.add_conditional_edges(
     "text_approval",
@@ -198,22 +181,16 @@ workflow.add_conditional_edges(
 # Final Composition
 workflow.add_conditional_edges(
     "check_approvals",
-    lambda s: "flyer" if s.get("image_approved") and s.get("text_approved") else "wait",
+    route_components,
     {"generate_flyer": "flyer", "wait": END}
 )
 workflow.add_edge("flyer", END)
 
-# Compile Workflow
-app = workflow.compile()
+# Compile Workflow, checkpointed after every node so finished work survives restarts
+app = workflow.compile(checkpointer=checkpointer())
 
 # Execution Example
 if __name__ == "__main__":
-    inputs = {"input_description": "Summer Music Festival Flyer"}
-    result = app.invoke(inputs)
-    
-    if "final_flyer" in result:
-        output_path = f"flyer_{uuid.uuid4()}.png"
-        cv2.imwrite(output_path, result["final_flyer"])
-        print(f"✅ Final flyer saved to {output_path}")
-    else:
-        print("❌ Process incomplete")
+    # Parse the flyer fonts before the first render
+    warm_up([("arialbd.ttf", 72), ("arial.ttf", 48)])
+    run_cli(app, "Summer Music Festival Flyer")
@@ -22,6 +22,7 @@ class ImageGeneratorPlan(BaseModel):
     branding_elements: List[str] = Field(..., description="Mandatory logos, watermarks, or mascots")
     aspect_ratio: str = Field(..., description="Required dimensions and orientation")
     image_text_integration: str = Field(..., description="How text should interact with images")
+    target_platforms: List[str] = Field(default_factory=list, description="Platforms to export versions for (e.g., 'instagram_post', 'facebook', 'print')")
 
 class FlyerGenerationPlan(BaseModel):
     text_plan: TextGeneratorPlan
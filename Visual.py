@@ -1,15 +1,19 @@
-from typing import TypedDict
+import asyncio
+import functools
+import time
+from typing import Annotated, TypedDict
 from langgraph.graph import StateGraph, END
-from openai import OpenAI
-import requests
-from PIL import Image, ImageDraw, ImageFont
-import io
+from llm_cache import flyer_gateway as gateway
+from flyer_assets import load_image
+from flyer_fonts import get_font, warm_up
+from PIL import ImageDraw
 import numpy as np
 import cv2
 import uuid
 
-# Initialize OpenAI client
-client = OpenAI()
+def merge_timings(left: dict, right: dict) -> dict:
+    """Reducer: parallel branches each add their own node timings"""
+    return {**(left or {}), **(right or {})}
 
 # Define state structure
 class FlyerState(TypedDict):
@@ -18,14 +22,27 @@ class FlyerState(TypedDict):
     image: str
     text: dict
     final_flyer: np.ndarray
+    timings: Annotated[dict, merge_timings]  # node -> wall-clock seconds
+
+def timed(name: str):
+    """Record a node's wall-clock time in the state's timings"""
+    def decorate(node):
+        @functools.wraps(node)
+        async def run(state: FlyerState) -> dict:
+            start = time.perf_counter()
+            update = await node(state)
+            return {**update, "timings": {name: time.perf_counter() - start}}
+        return run
+    return decorate
 
 # 1️⃣ Planner Agent
-def planner_agent(state: FlyerState) -> FlyerState:
+@timed("planner")
+async def planner_agent(state: FlyerState) -> dict:
     print("🛠️ Planning flyer strategy...")
     user_input = state["input_description"]
     
     # Generate flyer plan using LLM
-    response = client.chat.completions.create(
+    response = await gateway.chat(
         model="gpt-4-turbo",
         messages=[
             {"role": "system", "content": """You're a professional flyer designer. Create a detailed plan including:
@@ -38,26 +55,25 @@ def planner_agent(state: FlyerState) -> FlyerState:
         ]
     )
     
-    state["plan"] = response.choices[0].message.content
-    return state
+    return {"plan": response}
 
 # 2️⃣ Image Generator Agent
-def image_generator_agent(state: FlyerState) -> FlyerState:
+@timed("image_gen")
+async def image_generator_agent(state: FlyerState) -> dict:
     print("🎨 Generating flyer image...")
     plan = state["plan"]
     
     # Generate image prompt from plan
-    prompt_response = client.chat.completions.create(
+    image_prompt = await gateway.chat(
         model="gpt-4-turbo",
         messages=[
             {"role": "system", "content": "Create a detailed DALL-E prompt for flyer imagery based on the design plan"},
             {"role": "user", "content": plan}
         ]
     )
-    image_prompt = prompt_response.choices[0].message.content
     
     # Generate image using DALL-E
-    image_response = client.images.generate(
+    image_url = await gateway.image(
         model="dall-e-3",
         prompt=image_prompt,
         size="1024x1024",
@@ -65,16 +81,16 @@ def image_generator_agent(state: FlyerState) -> FlyerState:
         n=1,
     )
     
-    state["image"] = image_response.data[0].url
-    return state
+    return {"image": image_url}
 
 # 3️⃣ TextAnalyser Agent
-def text_analyser_agent(state: FlyerState) -> FlyerState:
+@timed("text_analyser")
+async def text_analyser_agent(state: FlyerState) -> dict:
     print("📝 Analyzing text content...")
     plan = state["plan"]
     
     # Generate text elements using LLM
-    response = client.chat.completions.create(
+    response = await gateway.chat(
         model="gpt-4-turbo",
         messages=[
             {"role": "system", "content": """Generate flyer text elements:
@@ -87,29 +103,19 @@ def text_analyser_agent(state: FlyerState) -> FlyerState:
         response_format={"type": "json_object"}
     )
     
-    state["text"] = eval(response.choices[0].message.content)
-    return state
+    return {"text": eval(response)}
 
 # 4️⃣ Flyer Agent
-def flyer_agent(state: FlyerState) -> FlyerState:
-    print("🖼️ Composing final flyer...")
-    image_url = state["image"]
-    text_elements = state["text"]
-    
+def compose_flyer(image_url: str, text_elements: dict) -> np.ndarray:
     # Download and process image
-    response = requests.get(image_url)
-    img = Image.open(io.BytesIO(response.content)).convert("RGB")
+    img = load_image(image_url).convert("RGB")
     
     # Create drawing context
     draw = ImageDraw.Draw(img)
     
-    # Load fonts
-    try:
-        headline_font = ImageFont.truetype("arialbd.ttf", 72)
-        subtext_font = ImageFont.truetype("arial.ttf", 48)
-    except:
-        headline_font = ImageFont.load_default()
-        subtext_font = ImageFont.load_default()
+    # Load fonts (shared, parsed once per process)
+    headline_font = get_font("arialbd.ttf", 72)
+    subtext_font = get_font("arial.ttf", 48)
     
     # Calculate positions
     img_width, img_height = img.size
@@ -137,8 +143,14 @@ def flyer_agent(state: FlyerState) -> FlyerState:
         draw.text((x, y), text, font=font, fill=(255, 255, 255))
     
     # Convert to OpenCV format for final output
-    state["final_flyer"] = cv2.cvtColor(np.array(img), cv2.COLOR_RGB2BGR)
-    return state
+    return cv2.cvtColor(np.array(img), cv2.COLOR_RGB2BGR)
+
+@timed("flyer")
+async def flyer_agent(state: FlyerState) -> dict:
+    print("🖼️ Composing final flyer...")
+    # Download, decode and drawing are blocking; keep them off the event loop
+    flyer = await asyncio.to_thread(compose_flyer, state["image"], state["text"])
+    return {"final_flyer": flyer}
 
 # Create workflow graph
 workflow = StateGraph(FlyerState)
@@ -149,19 +161,12 @@ workflow.add_node("image_gen", image_generator_agent)
 workflow.add_node("text_analyser", text_analyser_agent)
 workflow.add_node("flyer", flyer_agent)
 
-# Set up edges
+# Set up edges: fan out to both branches, which run concurrently
 workflow.add_edge("planner", "image_gen")
 workflow.add_edge("planner", "text_analyser")
 
-# Conditional edges for final composition
-def route_image(state):
-    return "flyer" if "text" in state else END
-
-def route_text(state):
-    return "flyer" if "image" in state else END
-
-workflow.add_conditional_edges("image_gen", route_image)
-workflow.add_conditional_edges("text_analyser", route_text)
+# Barrier join: flyer runs once, after both branches have finished
+workflow.add_edge(["image_gen", "text_analyser"], "flyer")
 workflow.add_edge("flyer", END)
 
 # Set entry point
@@ -172,8 +177,16 @@ app = workflow.compile()
 
 # Example usage
 if __name__ == "__main__":
+    # Parse the flyer fonts before the first render
+    warm_up([("arialbd.ttf", 72), ("arial.ttf", 48)])
     inputs = {"input_description": "Create a flyer for a summer music festival featuring jazz and blues artists"}
-    result = app.invoke(inputs)
+    start = time.perf_counter()
+    result = asyncio.run(app.ainvoke(inputs))
+    
+    # The branches overlap, so the total is about planner + max(image, text) + flyer
+    timings = result["timings"]
+    print(f"⏱️ {', '.join(f'{node} {seconds:.1f}s' for node, seconds in timings.items())}; "
+          f"total {time.perf_counter() - start:.1f}s")
     
     # Save and display result
     output_path = f"final_flyer_{uuid.uuid4()}.png"
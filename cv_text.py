@@ -0,0 +1,121 @@
+import os
+from dataclasses import dataclass
+from functools import lru_cache
+
+import cv2
+import numpy as np
+
+# Distinct text/style combinations kept as ready-to-blend sprites
+SPRITE_CACHE_SIZE = int(os.getenv("CV_SPRITE_CACHE_SIZE", 256))
+
+
+@dataclass(frozen=True)
+class TextStyle:
+    text: str
+    font_face: int = cv2.FONT_HERSHEY_SIMPLEX
+    font_scale: float = 1.0
+    color: tuple = (255, 255, 255)  # BGR
+    thickness: int = 2
+    line_type: int = cv2.LINE_AA
+    background_color: tuple = None  # BGR
+    background_opacity: float = 0.0
+    font_path: str = None  # TrueType font drawn through cv2.freetype instead of Hershey
+    font_height: int = None  # pixel height for font_path; defaults to 30 * font_scale
+
+
+@dataclass(frozen=True)
+class TextSprite:
+    """Premultiplied BGR and alpha of a rendered text block.
+
+    `offset` places the sprite relative to the text box's top-left corner
+    and `text_size` is the box used for positioning.
+    """
+    color: np.ndarray  # float32 (h, w, 3), premultiplied by alpha
+    alpha: np.ndarray  # float32 (h, w, 1) in [0, 1]
+    offset: tuple[int, int]
+    text_size: tuple[int, int]
+
+
+@lru_cache(maxsize=8)
+def _freetype(font_path: str):
+    ft = cv2.freetype.createFreeType2()
+    ft.loadFontData(fontFileName=font_path, id=0)
+    return ft
+
+
+def _measurer(style: TextStyle):
+    if style.font_path:
+        ft = _freetype(style.font_path)
+        height = style.font_height or round(30 * style.font_scale)
+        # A positive FreeType thickness strokes hollow outlines; -1 fills the glyphs.
+        # style.thickness still pads the box like it does for Hershey fonts.
+        measure = lambda line: ft.getTextSize(line, height, -1)
+        draw = lambda mask, line, org: ft.putText(mask, line, org, height, 255, -1,
+                                                  style.line_type, True)
+    else:
+        measure = lambda line: cv2.getTextSize(line, style.font_face, style.font_scale, style.thickness)
+        draw = lambda mask, line, org: cv2.putText(mask, line, org, style.font_face, style.font_scale,
+                                                   255, style.thickness, style.line_type)
+    return measure, draw
+
+
+@lru_cache(maxsize=SPRITE_CACHE_SIZE)
+def text_sprite(style: TextStyle) -> TextSprite:
+    """Rasterize a text block (and its shaded box) once; later calls reuse the sprite"""
+    measure, draw = _measurer(style)
+    lines = style.text.split('\n')
+    sizes = [measure(line) for line in lines]
+    # Same box as the editor always used: widest line, heights plus baseline and stroke
+    width = max(w for (w, _), _ in sizes)
+    height = sum(h + baseline + style.thickness for (_, h), baseline in sizes)
+    baseline = sizes[-1][1]
+    pad = max(style.thickness, 1) * 2
+
+    # First baseline sits at the bottom of the box, later lines go below it
+    origins, y = [], height
+    for (_, h), line_baseline in sizes:
+        origins.append(y)
+        y += h + line_baseline + style.thickness
+    top = min(-style.thickness - baseline, height - sizes[0][0][1]) - pad
+    bottom = max(height + style.thickness, origins[-1] + baseline) + pad
+    left, right = -style.thickness - pad, width + style.thickness + pad
+    size = (bottom - top, right - left)
+
+    text_mask = np.zeros(size, np.uint8)
+    for line, origin in zip(lines, origins):
+        draw(text_mask, line, (-left, origin - top))
+    text_alpha = text_mask.astype(np.float32)[..., None] / 255
+
+    color = text_alpha * np.array(style.color, np.float32)
+    alpha = text_alpha
+    if style.background_color is not None and style.background_opacity > 0:
+        box_alpha = np.zeros(size + (1,), np.float32)
+        box_alpha[-style.thickness - baseline - top:height + style.thickness - top + 1,
+                  -left - style.thickness:width + style.thickness - left + 1] = style.background_opacity
+        # Text over the box
+        color = color + (1 - text_alpha) * box_alpha * np.array(style.background_color, np.float32)
+        alpha = text_alpha + (1 - text_alpha) * box_alpha
+
+    color.flags.writeable = False
+    alpha.flags.writeable = False
+    return TextSprite(color, alpha, (left, top), (width, height))
+
+
+def blend(img: np.ndarray, sprite: TextSprite, x: int, y: int) -> np.ndarray:
+    """Alpha-blend `sprite` with its text box at (x, y), touching only the covered region"""
+    h, w = sprite.alpha.shape[:2]
+    x0, y0 = x + sprite.offset[0], y + sprite.offset[1]
+    ix0, iy0 = max(x0, 0), max(y0, 0)
+    ix1, iy1 = min(x0 + w, img.shape[1]), min(y0 + h, img.shape[0])
+    if ix0 >= ix1 or iy0 >= iy1:
+        return img
+    sx, sy = ix0 - x0, iy0 - y0
+    alpha = sprite.alpha[sy:sy + iy1 - iy0, sx:sx + ix1 - ix0]
+    color = sprite.color[sy:sy + iy1 - iy0, sx:sx + ix1 - ix0]
+    roi = img[iy0:iy1, ix0:ix1, :3]
+    roi[:] = np.clip(roi * (1 - alpha) + color + 0.5, 0, 255).astype(np.uint8)
+    return img
+
+
+def cache_info() -> dict:
+    return text_sprite.cache_info()._asdict()
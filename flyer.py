@@ -1,7 +1,11 @@
-from PIL import Image, ImageDraw, ImageFont, ImageOps, ImageFilter
-import requests
-from io import BytesIO
-import textwrap
+from PIL import Image, ImageDraw, ImageOps, ImageFilter
+from flyer_assets import load_image
+from flyer_backgrounds import linear_gradient, palette_background, palette_stops, to_image
+from flyer_fonts import get_font, warm_up
+from flyer_text import Shadow
+from flyer_layout import layout_text
+from flyer_layers import Layer, compositor
+from flyer_export import export, platforms_for
 
 class FlyerGenerator:
     def __init__(self, text_plan, image_plan):
@@ -10,19 +14,13 @@ class FlyerGenerator:
         self.width, self.height = 1200, 1600  # Standard flyer size
         
     def _create_gradient_background(self):
-        """Create a modern gradient background"""
-        base = Image.new('RGB', (self.width, self.height), '#FFFFFF')
-        top_color = self._hex_to_rgb('#FFEECC')
-        bottom_color = self._hex_to_rgb('#2A2A2A')
-        
-        for y in range(self.height):
-            r = top_color[0] + (bottom_color[0] - top_color[0]) * y // self.height
-            g = top_color[1] + (bottom_color[1] - top_color[1]) * y // self.height
-            b = top_color[2] + (bottom_color[2] - top_color[2]) * y // self.height
-            draw = ImageDraw.Draw(base)
-            draw.line([(0, y), (self.width, y)], fill=(r, g, b))
-        
-        return base
+        """Create a modern gradient background (from the plan's palette when it has one)"""
+        size = (self.width, self.height)
+        palette = getattr(self.image_plan, 'color_palette', None)
+        if palette and palette_stops(palette):
+            return to_image(palette_background(size, palette))
+        # Computed once per size; later renders reuse the cached buffer
+        return to_image(linear_gradient(size, ['#FFEECC', '#2A2A2A']))
 
     def _hex_to_rgb(self, hex_color):
         """Convert hex color to RGB tuple"""
@@ -32,8 +30,7 @@ class FlyerGenerator:
     def _load_image(self):
         """Load and process main image"""
         try:
-            response = requests.get(self.image_plan.image_url)
-            img = Image.open(BytesIO(response.content))
+            img = load_image(self.image_plan.image_url)
             
             # Create circular mask
             mask = Image.new('L', img.size, 0)
@@ -50,50 +47,26 @@ class FlyerGenerator:
             print(f"Error loading image: {e}")
             return None
 
-    def _add_text(self, draw, y_position, text, font_size, font_name, color, max_width, is_title=False):
+    def _add_text(self, canvas, y_position, text, font_size, font_name, color, max_width, is_title=False):
         """Smart text placement with wrapping and effects"""
-        try:
-            font = ImageFont.truetype(font_name, font_size)
-        except:
-            font = ImageFont.load_default(font_size)
-            
-        wrapped_text = textwrap.wrap(text, width=20 if is_title else 30)
-        text_height = 0
+        effects = self.text_plan.text_effects
+        # Translucent offset shadow and a text-colour-to-gold gradient, each one paste per line
+        shadow = Shadow(offset=(2, 2), color='#000000', opacity=0x88 / 255) if 'shadow' in effects else None
+        gradient = [color, (255, 215, 0)] if 'gradient' in effects else None
         
-        for line in wrapped_text:
-            bbox = draw.textbbox((0, 0), line, font=font)
-            text_width = bbox[2] - bbox[0]
-            x = (self.width - text_width) // 2 if is_title else (self.width//2 + 50)
-            
-            # Text shadow effect
-            if 'shadow' in self.text_plan.text_effects:
-                draw.text((x+2, y_position+2), line, font=font, fill='#00000088')
-                
-            # Gradient text effect
-            if 'gradient' in self.text_plan.text_effects:
-                for i, char in enumerate(line):
-                    ratio = i/len(line)
-                    r = int(color[0] * (1 - ratio) + 255 * ratio)
-                    g = int(color[1] * (1 - ratio) + 215 * ratio)
-                    b = int(color[2] * (1 - ratio) + 0 * ratio)
-                    draw.text((x + i*font_size*0.6, y_position), char, 
-                             font=font, fill=(r, g, b))
-            else:
-                draw.text((x, y_position), line, font=font, fill=color)
+        # Titles are centered on the flyer, body text starts right of the divider
+        layout = layout_text(text, font_name, font_size, max_width, "center" if is_title else "left",
+                             line_spacing=10)
+        x = (self.width - max_width) // 2 if is_title else self.width//2 + 50
+        layout.draw(canvas, (x, y_position), fill=color, gradient=gradient, shadow=shadow)
             
-            text_height += font_size + 10
-            y_position += font_size + 10
-            
-        return y_position
+        return y_position + layout.height + 10
 
     def _create_cta_button(self, draw):
         """Create modern CTA button"""
         button_text = self.text_plan.cta_button
         font_size = 40
-        try:
-            font = ImageFont.truetype(self.text_plan.font_style[0], font_size)
-        except:
-            font = ImageFont.load_default(font_size)
+        font = get_font(self.text_plan.font_style[0], font_size)
             
         bbox = draw.textbbox((0, 0), button_text, font=font)
         text_width = bbox[2] - bbox[0]
@@ -120,23 +93,21 @@ class FlyerGenerator:
             y + (button_height - text_height)/2 - 5
         ), button_text, font=font, fill='#FFFFFF')
         
-    def generate_flyer(self):
-        """Main flyer generation method"""
-        flyer = self._create_gradient_background()
-        draw = ImageDraw.Draw(flyer)
-        
-        # Add shaped image
+    def _draw_image(self, canvas):
+        """Add shaped image"""
         image = self._load_image()
-        if image:
-            flyer.paste(image, (100, 300), image)
-            
-        # Add text elements
+        if not image:
+            return False  # drawn without the image; don't cache it, retry next render
+        canvas.paste(image, (100, 300), image)
+
+    def _draw_texts(self, canvas):
+        """Headline and subtext"""
         y = 200
         primary_color = self._hex_to_rgb(self.text_plan.color_scheme)
         
         # Headline
         y = self._add_text(
-            draw, y, self.text_plan.primary_headline,
+            canvas, y, self.text_plan.primary_headline,
             font_size=80,
             font_name=self.text_plan.font_style[0],
             color=primary_color,
@@ -147,22 +118,46 @@ class FlyerGenerator:
         # Subtext
         y += 50
         self._add_text(
-            draw, y, self.text_plan.subtext,
+            canvas, y, self.text_plan.subtext,
             font_size=40,
             font_name=self.text_plan.font_style[1],
             color=primary_color,
             max_width=500
         )
+
+    def _draw_divider(self, canvas):
+        """Add decorative elements"""
+        ImageDraw.Draw(canvas).rectangle([self.width//2 - 2, 150, self.width//2 + 2, self.height - 250],
+                                         fill='#FFFFFF55')
+
+    def _layers(self):
+        """Layer stack of the flyer, each keyed on the plan fields it draws"""
+        text_plan = self.text_plan
+        return [
+            Layer("background", (repr(getattr(self.image_plan, 'color_palette', None)),),
+                  lambda canvas: canvas.paste(self._create_gradient_background())),
+            Layer("image", (self.image_plan.image_url,), self._draw_image),
+            Layer("text", (text_plan.primary_headline, text_plan.subtext, tuple(text_plan.font_style),
+                           text_plan.color_scheme, tuple(text_plan.text_effects)), self._draw_texts),
+            Layer("cta", (text_plan.cta_button, text_plan.font_style[0]),
+                  lambda canvas: self._create_cta_button(ImageDraw.Draw(canvas))),
+            Layer("divider", (), self._draw_divider),
+        ]
         
-        # Add CTA button
-        self._create_cta_button(draw)
-        
-        # Add decorative elements
-        draw.rectangle([self.width//2 - 2, 150, self.width//2 + 2, self.height - 250],
-                      fill='#FFFFFF55')
+    def generate_flyer(self):
+        """Main flyer generation method"""
+        warm_up([(self.text_plan.font_style[0], 80), (self.text_plan.font_style[1], 40),
+                 (self.text_plan.font_style[0], 40)])
+        # Only layers whose inputs changed since the last render are redrawn
+        flyer = compositor.compose((self.width, self.height), self._layers())
         
         # Save result
         flyer.save('modern_flyer.png', quality=95)
+        
+        # One version per planned platform, resampled from this render
+        platforms = getattr(self.image_plan, 'target_platforms', None)
+        if platforms:
+            export(flyer, platforms_for(platforms), 'exports', 'modern_flyer')
         return flyer
 
 # Usage
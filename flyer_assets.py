@@ -0,0 +1,220 @@
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+from urllib.parse import urlparse
+from urllib.request import pathname2url, url2pathname
+
+import numpy as np
+import requests
+from PIL import Image
+from requests.adapters import HTTPAdapter
+
+ASSET_CACHE_DIR = os.getenv("FLYER_ASSET_CACHE_DIR", os.path.expanduser("~/.cache/flyer_assets"))
+ASSET_TIMEOUT = float(os.getenv("FLYER_ASSET_TIMEOUT", 30))
+ASSET_WORKERS = int(os.getenv("FLYER_ASSET_WORKERS", 8))
+# Seconds a cached URL is trusted before it is revalidated with its ETag
+ASSET_MAX_AGE = float(os.getenv("FLYER_ASSET_MAX_AGE", 3600))
+# Decoded variants kept in memory on top of the disk cache
+ASSET_MEMORY_CACHE_SIZE = int(os.getenv("FLYER_ASSET_MEMORY_CACHE_SIZE", 64))
+
+
+def _sha256(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+
+def _atomic_write(path: str, write):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path))
+    try:
+        with os.fdopen(fd, "wb") as f:
+            write(f)
+        os.replace(tmp, path)
+    except BaseException:
+        os.unlink(tmp)
+        raise
+
+
+class AssetCache:
+    """Content-addressed disk cache for flyer images.
+
+    Layout under `root`:
+      urls/<sha256(url)>.json            ETag / Last-Modified and content hash of a URL
+      blobs/<ab>/<sha256>                raw downloaded bytes, stored once per content
+      variants/<sha256>-<w>x<h>.npy      decoded RGBA pixels, optionally thumbnailed
+    """
+
+    def __init__(self, root: str = ASSET_CACHE_DIR, timeout: float = ASSET_TIMEOUT,
+                 workers: int = ASSET_WORKERS, max_age: float = ASSET_MAX_AGE,
+                 memory_size: int = ASSET_MEMORY_CACHE_SIZE):
+        self.root = root
+        self.timeout = timeout
+        self.workers = workers
+        self.max_age = max_age
+        self.memory_size = memory_size
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=workers, pool_maxsize=workers)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self._counts = {"fresh": 0, "revalidated": 0, "downloaded": 0, "stale": 0,
+                        "decoded": 0, "disk_variants": 0, "memory_variants": 0}
+
+    def _count(self, name: str):
+        with self._lock:
+            self._counts[name] += 1
+
+    def _meta_path(self, url: str) -> str:
+        return os.path.join(self.root, "urls", _sha256(url.encode()) + ".json")
+
+    def _blob_path(self, digest: str) -> str:
+        return os.path.join(self.root, "blobs", digest[:2], digest)
+
+    def _variant_path(self, digest: str, size) -> str:
+        suffix = f"{size[0]}x{size[1]}" if size else "full"
+        return os.path.join(self.root, "variants", f"{digest}-{suffix}.npy")
+
+    def _read_meta(self, url: str) -> dict | None:
+        try:
+            with open(self._meta_path(url)) as f:
+                meta = json.load(f)
+        except (OSError, ValueError):
+            return None
+        return meta if os.path.exists(self._blob_path(meta["sha256"])) else None
+
+    def _write_meta(self, url: str, meta: dict):
+        _atomic_write(self._meta_path(url), lambda f: f.write(json.dumps(meta).encode()))
+
+    def _store_blob(self, data: bytes) -> str:
+        digest = _sha256(data)
+        blob_path = self._blob_path(digest)
+        if not os.path.exists(blob_path):
+            _atomic_write(blob_path, lambda f: f.write(data))
+        return digest
+
+    def fetch(self, url: str) -> str:
+        """Content hash of the bytes at `url`; downloads only when the cached copy is stale"""
+        url = str(url)
+        if url.startswith("file://"):
+            # Local files (e.g. images replayed from the LLM response cache)
+            with open(url2pathname(urlparse(url).path), "rb") as f:
+                return self._store_blob(f.read())
+        meta = self._read_meta(url)
+        headers = {}
+        if meta:
+            if time.time() - meta["checked_at"] < self.max_age:
+                self._count("fresh")
+                return meta["sha256"]
+            if meta.get("etag"):
+                headers["If-None-Match"] = meta["etag"]
+            if meta.get("last_modified"):
+                headers["If-Modified-Since"] = meta["last_modified"]
+        try:
+            response = self.session.get(url, headers=headers, timeout=self.timeout)
+            if response.status_code == 304 and meta:
+                meta["checked_at"] = time.time()
+                self._write_meta(url, meta)
+                self._count("revalidated")
+                return meta["sha256"]
+            response.raise_for_status()
+        except requests.RequestException as e:
+            if meta is None:
+                raise
+            print(f"Using cached copy of {url}: {e}")
+            self._count("stale")
+            return meta["sha256"]
+
+        digest = self._store_blob(response.content)
+        self._write_meta(url, {
+            "url": url,
+            "sha256": digest,
+            "etag": response.headers.get("ETag"),
+            "last_modified": response.headers.get("Last-Modified"),
+            "checked_at": time.time(),
+        })
+        self._count("downloaded")
+        return digest
+
+    def persist(self, url: str) -> str:
+        """file:// URL of the cached bytes at `url`, for references that must outlive it"""
+        return "file://" + pathname2url(os.path.abspath(self._blob_path(self.fetch(url))))
+
+    def _pixels(self, digest: str, size) -> np.ndarray:
+        key = (digest, size)
+        with self._lock:
+            array = self._memory.get(key)
+            if array is not None:
+                self._memory.move_to_end(key)
+                self._counts["memory_variants"] += 1
+                return array
+
+        path = self._variant_path(digest, size)
+        if os.path.exists(path):
+            array = np.load(path)
+            self._count("disk_variants")
+        else:
+            with open(self._blob_path(digest), "rb") as f:
+                image = Image.open(BytesIO(f.read())).convert("RGBA")
+            if size:
+                image.thumbnail(size, Image.Resampling.LANCZOS)
+            array = np.asarray(image)
+            _atomic_write(path, lambda f: np.save(f, array))
+            self._count("decoded")
+
+        array.flags.writeable = False
+        with self._lock:
+            self._memory[key] = array
+            while len(self._memory) > self.memory_size:
+                self._memory.popitem(last=False)
+        return array
+
+    def image(self, url: str, size: tuple[int, int] = None) -> Image.Image:
+        """Decoded RGBA image for `url`, thumbnailed to fit `size` when given"""
+        size = tuple(size) if size else None
+        return Image.fromarray(self._pixels(self.fetch(url), size).copy(), "RGBA")
+
+    def prefetch(self, items) -> dict:
+        """Fetch and decode many images concurrently.
+
+        Items are URLs or (url, size) pairs; returns {item: image} for the
+        ones that loaded. Failures are reported and skipped.
+        """
+        def load(item):
+            url, size = (item, None) if isinstance(item, str) else item
+            try:
+                return item, self.image(url, size)
+            except Exception as e:
+                print(f"Error loading image {url}: {e}")
+                return item, None
+
+        unique = list(dict.fromkeys(items))
+        if not unique:
+            return {}
+        with ThreadPoolExecutor(min(self.workers, len(unique))) as pool:
+            return {item: image for item, image in pool.map(load, unique) if image is not None}
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {**self._counts, "memory_size": len(self._memory)}
+
+
+# Shared by every renderer in the process
+assets = AssetCache()
+
+
+def load_image(url: str, size: tuple[int, int] = None) -> Image.Image:
+    return assets.image(url, size)
+
+
+def prefetch(items) -> dict:
+    return assets.prefetch(items)
+
+
+def persist(url: str) -> str:
+    return assets.persist(url)
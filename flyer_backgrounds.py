@@ -0,0 +1,151 @@
+import os
+import threading
+from collections import OrderedDict
+
+import numpy as np
+from PIL import Image
+
+# Number of distinct backgrounds (size + stops + shape) kept in memory
+BACKGROUND_CACHE_SIZE = int(os.getenv("FLYER_BACKGROUND_CACHE_SIZE", 32))
+
+# Palette keys that come first when a palette dict becomes gradient stops
+PALETTE_ORDER = ("primary", "secondary", "accent", "background")
+
+_cache = OrderedDict()
+_lock = threading.Lock()
+_hits = 0
+_misses = 0
+
+
+def hex_to_rgb(hex_color: str) -> tuple[int, int, int]:
+    """Convert '#RRGGBB' (or 'RGB') to an RGB tuple"""
+    hex_color = hex_color.strip().lstrip('#')
+    if len(hex_color) == 3:
+        hex_color = "".join(c * 2 for c in hex_color)
+    return tuple(int(hex_color[i:i+2], 16) for i in (0, 2, 4))
+
+
+def normalize_stops(stops) -> tuple:
+    """Turn colors or (position, color) pairs into a hashable ((pos, (r, g, b)), ...) tuple.
+
+    Plain colors are spread evenly from 0 to 1.
+    """
+    stops = list(stops)
+    if not stops:
+        raise ValueError("A gradient needs at least one color")
+    if not all(isinstance(stop, (tuple, list)) and len(stop) == 2 for stop in stops):
+        step = 1 / max(len(stops) - 1, 1)
+        stops = [(i * step, color) for i, color in enumerate(stops)]
+    return tuple(sorted(
+        (float(pos), hex_to_rgb(color) if isinstance(color, str) else tuple(color))
+        for pos, color in stops
+    ))
+
+
+def _interpolate(t: np.ndarray, stops: tuple) -> np.ndarray:
+    """Map positions `t` in [0, 1] to uint8 RGB through the color stops"""
+    positions = np.array([pos for pos, _ in stops], dtype=np.float32)
+    colors = np.array([color for _, color in stops], dtype=np.float32)
+    out = np.empty(t.shape + (3,), dtype=np.uint8)
+    for channel in range(3):
+        out[..., channel] = np.rint(np.interp(t, positions, colors[:, channel]))
+    return out
+
+
+def _cached(key, build) -> np.ndarray:
+    global _hits, _misses
+    with _lock:
+        array = _cache.get(key)
+        if array is not None:
+            _cache.move_to_end(key)
+            _hits += 1
+            return array
+        _misses += 1
+    array = build()
+    array.setflags(write=False)  # shared between renders
+    with _lock:
+        _cache[key] = array
+        while len(_cache) > BACKGROUND_CACHE_SIZE:
+            _cache.popitem(last=False)
+    return array
+
+
+def linear_gradient(size: tuple[int, int], stops, angle: float = 90, cache: bool = True) -> np.ndarray:
+    """(height, width, 3) gradient along `angle` degrees (0 = left to right, 90 = top to bottom).
+
+    Pass cache=False for one-off sizes (e.g. text fills) so they do not
+    evict full-size backgrounds from the LRU.
+    """
+    width, height = size
+    stops = normalize_stops(stops)
+
+    def build():
+        if angle % 180 in (0, 90):
+            # Axis-aligned: interpolate one row or column and broadcast it
+            vertical = angle % 180 == 90
+            n = height if vertical else width
+            t = np.linspace(0, 1, n, dtype=np.float32)
+            if angle % 360 >= 180:
+                t = t[::-1]
+            line = _interpolate(t, stops)
+            shape = (height, width, 3)
+            return np.ascontiguousarray(np.broadcast_to(line[:, None] if vertical else line[None], shape))
+
+        theta = np.deg2rad(angle)
+        xs = np.arange(width, dtype=np.float32) * np.cos(theta)
+        ys = np.arange(height, dtype=np.float32) * np.sin(theta)
+        projection = ys[:, None] + xs[None, :]
+        low, high = projection.min(), projection.max()
+        return _interpolate((projection - low) / (high - low), stops)
+
+    if not cache:
+        return build()
+    return _cached(("linear", size, stops, angle), build)
+
+
+def radial_gradient(size: tuple[int, int], stops, center: tuple[float, float] = (0.5, 0.5),
+                    radius: float = None) -> np.ndarray:
+    """(height, width, 3) gradient from `center` (fractions of the size) outwards.
+
+    `radius` is in pixels and defaults to the distance to the farthest corner.
+    """
+    width, height = size
+    stops = normalize_stops(stops)
+
+    def build():
+        cx, cy = center[0] * width, center[1] * height
+        dx = (np.arange(width, dtype=np.float32) - cx) ** 2
+        dy = (np.arange(height, dtype=np.float32) - cy) ** 2
+        distance = np.sqrt(dy[:, None] + dx[None, :])
+        r = radius or max(np.hypot(x - cx, y - cy) for x in (0, width) for y in (0, height))
+        return _interpolate(np.minimum(distance / r, 1), stops)
+
+    return _cached(("radial", size, stops, center, radius), build)
+
+
+def palette_stops(palette: dict[str, str]) -> list[str]:
+    """Gradient colors from a plan's color palette: primary, secondary, ... then the rest"""
+    ordered = [palette[key] for key in PALETTE_ORDER if key in palette]
+    ordered += [color for key, color in palette.items() if key not in PALETTE_ORDER]
+    return [color for color in ordered if isinstance(color, str) and color.strip().startswith('#')]
+
+
+def palette_background(size: tuple[int, int], palette: dict[str, str], kind: str = "linear",
+                       **options) -> np.ndarray:
+    """Background from `ImageGeneratorPlan.color_palette` (linear or radial)"""
+    stops = palette_stops(palette)
+    if not stops:
+        raise ValueError(f"No hex colors in palette: {palette}")
+    if kind == "radial":
+        return radial_gradient(size, stops, **options)
+    return linear_gradient(size, stops, **options)
+
+
+def to_image(array: np.ndarray) -> Image.Image:
+    """Fresh PIL image from a cached background; drawing on it leaves the cache intact"""
+    return Image.fromarray(array, "RGB")
+
+
+def cache_info() -> dict:
+    with _lock:
+        return {"size": len(_cache), "maxsize": BACKGROUND_CACHE_SIZE, "hits": _hits, "misses": _misses}
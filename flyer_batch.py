@@ -0,0 +1,131 @@
+import importlib
+import importlib.util
+import multiprocessing
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from importlib.machinery import SourceFileLoader
+from multiprocessing import shared_memory
+
+import numpy as np
+from PIL import Image
+
+from flyer_assets import prefetch
+
+BATCH_WORKERS = int(os.getenv("FLYER_BATCH_WORKERS", 0)) or os.cpu_count() or 1
+
+
+class SharedImages:
+    """Decoded RGBA images packed into one shared-memory block.
+
+    Pool workers attach to the block by name and wrap the pixels in PIL
+    images without copying or re-decoding them.
+    """
+
+    def __init__(self, images: dict[str, Image.Image]):
+        arrays = {key: np.asarray(image.convert("RGBA")) for key, image in images.items()}
+        total = sum(a.nbytes for a in arrays.values())
+        self.shm = shared_memory.SharedMemory(create=True, size=max(total, 1))
+        self.layout = {}
+        offset = 0
+        for key, array in arrays.items():
+            view = np.ndarray(array.shape, np.uint8, self.shm.buf, offset)
+            view[:] = array
+            self.layout[key] = (offset, array.shape)
+            offset += array.nbytes
+
+    @property
+    def spec(self) -> tuple:
+        """Picklable handle for workers"""
+        return self.shm.name, self.layout
+
+    @staticmethod
+    def attach(spec: tuple) -> tuple[shared_memory.SharedMemory, dict[str, Image.Image]]:
+        name, layout = spec
+        shm = shared_memory.SharedMemory(name=name)
+        images = {}
+        for key, (offset, shape) in layout.items():
+            height, width, _ = shape
+            buffer = shm.buf[offset:offset + height * width * 4]
+            # Read-only image over the shared pixels; callers copy before mutating
+            images[key] = Image.frombuffer("RGBA", (width, height), buffer, "raw", "RGBA", 0, 1)
+        return shm, images
+
+    def close(self):
+        self.shm.close()
+        self.shm.unlink()
+
+
+def _module_ref(render) -> tuple:
+    """Picklable (module name, file) of `render`'s module, so workers can import it"""
+    module = sys.modules[render.__module__]
+    return render.__module__, getattr(module, "__file__", None)
+
+
+def _import_module(name: str, path: str):
+    """Import `name`, loading it from `path` when it is not on sys.path.
+
+    Scripts without a .py suffix (FlyerPIL) cannot be imported by name, but
+    the worker needs them registered before it unpickles functions and
+    configs defined there.
+    """
+    try:
+        return importlib.import_module(name)
+    except ImportError:
+        if path is None:
+            raise
+        loader = SourceFileLoader(name, path)
+        module = importlib.util.module_from_spec(importlib.util.spec_from_loader(name, loader))
+        sys.modules[name] = module
+        loader.exec_module(module)
+        return module
+
+
+# ---- worker side ----
+_worker_shm = None
+_worker_assets = {}
+
+
+def _init_worker(spec, module_ref):
+    global _worker_shm, _worker_assets
+    _import_module(*module_ref)
+    _worker_shm, _worker_assets = SharedImages.attach(spec)
+
+
+def _render_timed(render, item, output_path, assets):
+    start = time.perf_counter()
+    render(item, output_path, assets)
+    return output_path, time.perf_counter() - start
+
+
+def _run(task):
+    return _render_timed(*task, _worker_assets)
+
+
+def render_batch(items, output_paths, render, asset_urls, workers: int = BATCH_WORKERS) -> list:
+    """Render many variants across a process pool.
+
+    `asset_urls(item)` lists the images an item needs; they are fetched
+    and decoded once for the whole batch and shared with the workers.
+    `render(item, output_path, assets)` must be a module-level function;
+    each worker renders and writes its own outputs, so encoding and file
+    writes run concurrently. Returns (output_path, seconds) per item.
+    """
+    items = list(items)
+    # Downloaded concurrently through the asset cache, decoded once for the batch
+    assets = prefetch(url for item in items for url in asset_urls(item))
+    tasks = [(render, item, path) for item, path in zip(items, output_paths)]
+    if workers <= 1 or len(tasks) <= 1:
+        return [_render_timed(*task, assets) for task in tasks]
+    shared = SharedImages(assets)
+    try:
+        # Workers start from a forkserver rather than a fork of this (possibly
+        # multithreaded) process and import `render`'s module themselves
+        with ProcessPoolExecutor(workers, mp_context=multiprocessing.get_context("forkserver"),
+                                 initializer=_init_worker,
+                                 initargs=(shared.spec, _module_ref(render))) as pool:
+            chunksize = max(1, len(tasks) // (workers * 4))
+            return list(pool.map(_run, tasks, chunksize=chunksize))
+    finally:
+        shared.close()
@@ -0,0 +1,118 @@
+import argparse
+import json
+import os
+import sqlite3
+import time
+import uuid
+from contextlib import closing
+
+from langgraph.checkpoint.sqlite import SqliteSaver
+from langgraph.types import Command
+
+# Graph state is written here after every node; approvals resume from it
+CHECKPOINT_DB = os.getenv("FLYER_CHECKPOINT_DB", "flyer_checkpoints.sqlite")
+OUTPUT_DIR = os.getenv("FLYER_OUTPUT_DIR", ".")
+
+
+def checkpointer(path: str = CHECKPOINT_DB) -> SqliteSaver:
+    # The connection outlives a single call; graphs may run nodes from worker threads
+    return SqliteSaver(sqlite3.connect(path, check_same_thread=False))
+
+
+def thread_config(thread_id: str) -> dict:
+    return {"configurable": {"thread_id": thread_id}}
+
+
+def pending_interrupts(app, thread_id: str) -> list:
+    """Interrupts (approval requests) a thread is waiting on"""
+    state = app.get_state(thread_config(thread_id))
+    return [interrupt for task in state.tasks for interrupt in task.interrupts]
+
+
+# Our own index of started flyers, next to (not inside) langgraph's tables, so
+# listing them does not depend on the saver's schema or load any checkpoint
+def _thread_index(path: str = CHECKPOINT_DB) -> sqlite3.Connection:
+    conn = sqlite3.connect(path)
+    conn.execute("CREATE TABLE IF NOT EXISTS flyer_threads (thread_id TEXT PRIMARY KEY, started REAL NOT NULL)")
+    return conn
+
+
+def register_thread(thread_id: str, path: str = CHECKPOINT_DB):
+    with closing(_thread_index(path)) as conn, conn:
+        conn.execute("INSERT OR IGNORE INTO flyer_threads VALUES (?, ?)", (thread_id, time.time()))
+
+
+def finish_thread(thread_id: str, path: str = CHECKPOINT_DB):
+    with closing(_thread_index(path)) as conn, conn:
+        conn.execute("DELETE FROM flyer_threads WHERE thread_id = ?", (thread_id,))
+
+
+def thread_ids(path: str = CHECKPOINT_DB) -> list[str]:
+    """Flyers that have not finished yet, most recently started first"""
+    with closing(_thread_index(path)) as conn:
+        return [row[0] for row in conn.execute("SELECT thread_id FROM flyer_threads ORDER BY started DESC")]
+
+
+def _report(app, thread_id: str):
+    """Print what a thread waits on, or save its flyer when it has finished"""
+    state = app.get_state(thread_config(thread_id))
+    interrupts = pending_interrupts(app, thread_id)
+    if interrupts:
+        print(f"⏸️ {thread_id} waiting for:")
+        for interrupt in interrupts:
+            print(json.dumps(interrupt.value, indent=2, default=str))
+    elif not state.next and state.values.get("final_flyer"):
+        output_path = os.path.join(OUTPUT_DIR, f"flyer_{thread_id}.png")
+        with open(output_path, "wb") as f:
+            f.write(state.values["final_flyer"])
+        print(f"✅ Final flyer saved to {output_path}")
+        finish_thread(thread_id)
+    elif not state.next:
+        print(f"❌ {thread_id} finished without a flyer")
+        finish_thread(thread_id)
+    else:
+        print(f"▶️ {thread_id} next: {', '.join(state.next)}")
+
+
+def run_cli(app, default_description: str, argv=None):
+    """start / pending / review / approve / reject commands for a checkpointed flyer graph.
+
+    Each command runs until the graph next needs a human and then exits, so
+    any number of flyers can wait for review without a process each.
+    """
+    parser = argparse.ArgumentParser(description="Checkpointed flyer approvals")
+    commands = parser.add_subparsers(dest="command", required=True)
+    start = commands.add_parser("start", help="Start a new flyer")
+    start.add_argument("description", nargs="?", default=default_description)
+    commands.add_parser("pending", help="List flyers waiting for approval")
+    review = commands.add_parser("review", help="Show what a flyer waits on")
+    review.add_argument("thread_id")
+    for name in ("approve", "reject"):
+        decide = commands.add_parser(name, help=f"{name.capitalize()} a pending item and resume")
+        decide.add_argument("thread_id")
+        decide.add_argument("kind", nargs="?", help="plan, image or text (default: every pending item)")
+        decide.add_argument("--feedback", default="")
+    args = parser.parse_args(argv)
+
+    if args.command == "start":
+        thread_id = str(uuid.uuid4())
+        register_thread(thread_id)
+        app.invoke({"input_description": args.description}, thread_config(thread_id))
+        _report(app, thread_id)
+    elif args.command == "pending":
+        for thread_id in thread_ids():
+            interrupts = pending_interrupts(app, thread_id)
+            if interrupts:
+                print(f"{thread_id}: {', '.join(i.value.get('kind') for i in interrupts)}")
+    elif args.command == "review":
+        _report(app, args.thread_id)
+    else:
+        interrupts = [i for i in pending_interrupts(app, args.thread_id)
+                      if args.kind in (None, i.value.get("kind"))]
+        if not interrupts:
+            print(f"Nothing pending for {args.thread_id}" + (f" ({args.kind})" if args.kind else ""))
+            return
+        decision = {"approved": args.command == "approve", "feedback": args.feedback}
+        # Completed nodes are restored from the checkpoint, not executed again
+        app.invoke(Command(resume={i.id: decision for i in interrupts}), thread_config(args.thread_id))
+        _report(app, args.thread_id)
@@ -0,0 +1,146 @@
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from io import BytesIO
+
+from PIL import Image
+
+EXPORT_WORKERS = int(os.getenv("FLYER_EXPORT_WORKERS", 0)) or os.cpu_count() or 1
+# Lowest quality a lossy encode may drop to while trying to meet a size budget
+MIN_QUALITY = int(os.getenv("FLYER_EXPORT_MIN_QUALITY", 60))
+
+
+@dataclass(frozen=True)
+class Platform:
+    name: str
+    size: tuple[int, int]
+    formats: tuple[str, ...] = ("png", "jpeg", "webp")
+    quality: int = 90
+    max_bytes: int | None = None  # budget for lossy formats
+
+
+PLATFORMS = {
+    p.name: p for p in [
+        Platform("instagram_post", (1080, 1080), ("jpeg", "webp"), 90, 1_000_000),
+        Platform("instagram_story", (1080, 1920), ("jpeg", "webp"), 90, 1_500_000),
+        Platform("facebook_post", (1200, 630), ("jpeg", "png"), 90, 1_000_000),
+        Platform("twitter_post", (1600, 900), ("jpeg", "webp"), 88, 1_000_000),
+        Platform("linkedin_post", (1200, 627), ("jpeg", "png"), 90, 1_000_000),
+        Platform("web_banner", (1200, 400), ("webp", "jpeg"), 85, 300_000),
+        Platform("email", (600, 800), ("jpeg",), 80, 200_000),
+        Platform("print", (2480, 3508), ("png",)),
+    ]
+}
+
+EXTENSIONS = {"png": "png", "jpeg": "jpg", "webp": "webp"}
+
+
+def platforms_for(names) -> list[Platform]:
+    """Platforms matching names such as 'Instagram' or 'facebook_post'; unknown names are reported"""
+    selected = []
+    for name in names:
+        key = name.strip().lower().replace(" ", "_")
+        matches = [p for p in PLATFORMS.values() if p.name == key or p.name.startswith(key + "_")]
+        if not matches:
+            print(f"Unknown export platform: {name}")
+        selected.extend(p for p in matches if p not in selected)
+    return selected
+
+
+class Pyramid:
+    """Successive 2x box reductions of a master image.
+
+    Each derived size is resampled from the smallest level that is still
+    at least as large, so a Lanczos pass never runs over the full master
+    for a small target.
+    """
+
+    def __init__(self, master: Image.Image):
+        self.levels = [master.convert("RGB")]
+
+    def _level(self, scale: float) -> tuple[Image.Image, int]:
+        """Smallest level whose resolution is at least `scale` of the master"""
+        factor = 1
+        while scale * factor * 2 <= 1:
+            index = factor.bit_length()
+            if index >= len(self.levels):
+                previous = self.levels[-1]
+                if min(previous.size) < 2:
+                    break
+                self.levels.append(previous.reduce(2))
+            factor *= 2
+        return self.levels[factor.bit_length() - 1], factor
+
+    def resize(self, size: tuple[int, int]) -> Image.Image:
+        """Cover-crop the master to the target aspect ratio and resample it to `size`"""
+        width, height = self.levels[0].size
+        scale = max(size[0] / width, size[1] / height)
+        # Crop box on the master, centered
+        crop_w, crop_h = size[0] / scale, size[1] / scale
+        left, top = (width - crop_w) / 2, (height - crop_h) / 2
+        level, factor = self._level(scale)
+        box = (left / factor, top / factor, (left + crop_w) / factor, (top + crop_h) / factor)
+        return level.resize(size, Image.Resampling.LANCZOS, box=box)
+
+
+def encode(image: Image.Image, fmt: str, quality: int = 90) -> bytes:
+    buffer = BytesIO()
+    if fmt == "png":
+        image.save(buffer, "PNG", compress_level=6)
+    elif fmt == "jpeg":
+        image.save(buffer, "JPEG", quality=quality, progressive=True, optimize=True)
+    elif fmt == "webp":
+        image.save(buffer, "WEBP", quality=quality, method=4)
+    else:
+        raise ValueError(f"Unsupported export format: {fmt}")
+    return buffer.getvalue()
+
+
+def encode_within_budget(image: Image.Image, fmt: str, quality: int, max_bytes: int = None) -> tuple[bytes, int]:
+    """Encode at `quality`, lowering it (binary search) until the output fits `max_bytes`"""
+    data = encode(image, fmt, quality)
+    if fmt == "png" or max_bytes is None or len(data) <= max_bytes:
+        return data, quality
+    best, best_quality = None, None
+    low, high = MIN_QUALITY, quality - 1
+    while low <= high:
+        mid = (low + high) // 2
+        candidate = encode(image, fmt, mid)
+        if len(candidate) <= max_bytes:
+            best, best_quality = candidate, mid
+            low = mid + 1
+        else:
+            high = mid - 1
+    if best is None:
+        print(f"{fmt} export over budget at quality {MIN_QUALITY}")
+        return encode(image, fmt, MIN_QUALITY), MIN_QUALITY
+    return best, best_quality
+
+
+def export(master: Image.Image, platforms, out_dir: str, basename: str = "flyer",
+           workers: int = EXPORT_WORKERS) -> list[dict]:
+    """Derive every platform size from one rendered master and encode all formats in parallel.
+
+    Returns one record (platform, format, path, bytes, quality, seconds) per file written.
+    """
+    platforms = [PLATFORMS[p] if isinstance(p, str) else p for p in platforms]
+    os.makedirs(out_dir, exist_ok=True)
+    pyramid = Pyramid(master)
+    # Resizes are cheap next to encoding; do them up front so the level list is not shared across threads
+    sized = {p.name: pyramid.resize(p.size) for p in platforms}
+
+    def write(job):
+        platform, fmt = job
+        start = time.perf_counter()
+        data, quality = encode_within_budget(sized[platform.name], fmt, platform.quality, platform.max_bytes)
+        path = os.path.join(out_dir, f"{basename}_{platform.name}.{EXTENSIONS[fmt]}")
+        with open(path, "wb") as f:
+            f.write(data)
+        return {"platform": platform.name, "format": fmt, "path": path, "bytes": len(data),
+                "quality": quality, "seconds": time.perf_counter() - start}
+
+    jobs = [(platform, fmt) for platform in platforms for fmt in platform.formats]
+    # PIL releases the GIL while encoding, so threads encode in parallel
+    with ThreadPoolExecutor(max(1, min(workers, len(jobs)))) as pool:
+        return list(pool.map(write, jobs))
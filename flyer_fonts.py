@@ -0,0 +1,138 @@
+import logging
+import os
+import string
+import threading
+
+from PIL import ImageFont
+
+# Extra font directories (os.pathsep separated), searched before the system ones
+FONT_DIRS = [d for d in os.getenv("FLYER_FONT_DIRS", "").split(os.pathsep) if d]
+SYSTEM_FONT_DIRS = [
+    "/usr/share/fonts",
+    "/usr/local/share/fonts",
+    os.path.expanduser("~/.fonts"),
+    os.path.expanduser("~/.local/share/fonts"),
+    os.path.expanduser("~/Library/Fonts"),
+    "/Library/Fonts",
+    "/System/Library/Fonts",
+    os.path.join(os.environ.get("WINDIR", "C:\\Windows"), "Fonts"),
+]
+FONT_SUFFIXES = (".ttf", ".otf", ".ttc")
+WARMUP_CHARS = string.ascii_letters + string.digits + string.punctuation + " "
+
+logger = logging.getLogger(__name__)
+
+
+class GlyphMetrics:
+    """Advance widths of a font, measured once per character"""
+
+    def __init__(self, font: ImageFont.FreeTypeFont):
+        self.font = font
+        self._advances: dict[str, float] = {}
+
+    def advance(self, char: str) -> float:
+        width = self._advances.get(char)
+        if width is None:
+            width = self._advances[char] = self.font.getlength(char)
+        return width
+
+    def width(self, text: str) -> float:
+        """Width of `text` from cached advances (kerning is ignored)"""
+        return sum(self.advance(char) for char in text)
+
+    def warm_up(self, chars: str = WARMUP_CHARS):
+        for char in chars:
+            self.advance(char)
+
+
+class FontRegistry:
+    """Resolves font names to files once and shares loaded fonts across the process"""
+
+    def __init__(self, font_dirs: list[str] = None):
+        self.font_dirs = font_dirs if font_dirs is not None else FONT_DIRS + SYSTEM_FONT_DIRS
+        self._index = None
+        self._paths: dict[str, str | None] = {}
+        self._fonts: dict[tuple[str | None, int], ImageFont.FreeTypeFont] = {}
+        self._metrics: dict[int, GlyphMetrics] = {}
+        self._lock = threading.RLock()
+
+    def _build_index(self) -> dict[str, str]:
+        # file name and stem, lower-cased, -> path; earlier directories win
+        index = {}
+        for font_dir in self.font_dirs:
+            for root, _, files in os.walk(font_dir):
+                for file in files:
+                    if file.lower().endswith(FONT_SUFFIXES):
+                        path = os.path.join(root, file)
+                        index.setdefault(file.lower(), path)
+                        index.setdefault(os.path.splitext(file)[0].lower(), path)
+        return index
+
+    def resolve(self, name: str) -> str | None:
+        """Path of a font given as a path, a file name ('arialbd.ttf') or a name ('Arial')"""
+        with self._lock:
+            if name in self._paths:
+                return self._paths[name]
+            if os.path.isfile(name):
+                path = name
+            else:
+                if self._index is None:
+                    self._index = self._build_index()
+                key = os.path.basename(name).lower()
+                path = self._index.get(key) or self._index.get(os.path.splitext(key)[0])
+                if path is None:
+                    logger.warning("Font not found: %s; using the default font", name)
+            self._paths[name] = path
+            return path
+
+    def get(self, name: str, size: int) -> ImageFont.FreeTypeFont:
+        """Loaded font for (name, size); files are parsed once per size"""
+        path = self.resolve(name)
+        key = (path, size)
+        with self._lock:
+            font = self._fonts.get(key)
+            if font is None:
+                try:
+                    font = ImageFont.truetype(path, size) if path else ImageFont.load_default(size)
+                except OSError as e:
+                    logger.warning("Error loading font %s: %s", name, e)
+                    font = ImageFont.load_default(size)
+                self._fonts[key] = font
+            return font
+
+    def metrics(self, font: ImageFont.FreeTypeFont) -> GlyphMetrics:
+        with self._lock:
+            metrics = self._metrics.get(id(font))
+            if metrics is None:
+                metrics = self._metrics[id(font)] = GlyphMetrics(font)
+            return metrics
+
+    def warm_up(self, fonts, chars: str = WARMUP_CHARS):
+        """Load (name, size) pairs and measure common glyphs ahead of the first render"""
+        for name, size in fonts:
+            self.metrics(self.get(name, size)).warm_up(chars)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "resolved": len(self._paths),
+                "missing": sorted(name for name, path in self._paths.items() if path is None),
+                "fonts": len(self._fonts),
+                "glyphs": sum(len(m._advances) for m in self._metrics.values()),
+            }
+
+
+# Shared by every renderer in the process
+registry = FontRegistry()
+
+
+def get_font(name: str, size: int) -> ImageFont.FreeTypeFont:
+    return registry.get(name, size)
+
+
+def text_width(font: ImageFont.FreeTypeFont, text: str) -> float:
+    return registry.metrics(font).width(text)
+
+
+def warm_up(fonts, chars: str = WARMUP_CHARS):
+    registry.warm_up(fonts, chars)
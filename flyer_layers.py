@@ -0,0 +1,133 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Callable
+
+from PIL import Image, ImageDraw
+
+from flyer_assets import load_image
+
+# Composited layer prefixes kept in memory (each is one full canvas)
+LAYER_CACHE_SIZE = int(os.getenv("FLYER_LAYER_CACHE_SIZE", 16))
+
+
+@dataclass(frozen=True)
+class Layer:
+    """One step of a flyer composition.
+
+    `key` holds every input the layer's pixels depend on; `draw` paints
+    the layer onto the canvas composited from the layers below it. A draw
+    that returns False rendered a fallback (e.g. its image failed to load),
+    so neither it nor the layers above it are cached and it is retried.
+    """
+    name: str
+    key: tuple
+    draw: Callable[[Image.Image], bool | None] = field(compare=False)
+
+
+class LayerCompositor:
+    """Composes layer stacks, caching the canvas after every layer.
+
+    The cache key of a canvas is the (name, key) of all layers up to it,
+    so when only one layer changes the stack below it is reused and only
+    that layer and the ones above it are redrawn.
+    """
+
+    def __init__(self, maxsize: int = LAYER_CACHE_SIZE):
+        self.maxsize = maxsize
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.last_timings: dict[str, float] = {}
+
+    def _get(self, prefix):
+        with self._lock:
+            canvas = self._cache.get(prefix)
+            if canvas is not None:
+                self._cache.move_to_end(prefix)
+                self.hits += 1
+            else:
+                self.misses += 1
+            return canvas
+
+    def _set(self, prefix, canvas):
+        with self._lock:
+            self._cache[prefix] = canvas
+            while len(self._cache) > self.maxsize:
+                self._cache.popitem(last=False)
+
+    def compose(self, size: tuple[int, int], layers: list[Layer], mode: str = "RGB",
+                color=0) -> Image.Image:
+        """Canvas with every layer drawn in order; the result is a copy the caller may modify"""
+        # Start from the longest cached prefix of the stack
+        canvas, start = None, 0
+        for i in range(len(layers), 0, -1):
+            canvas = self._get((size, mode, color) + tuple((l.name, l.key) for l in layers[:i]))
+            if canvas is not None:
+                start = i
+                break
+        if canvas is None:
+            canvas = Image.new(mode, size, color)
+
+        timings = {}
+        cacheable = True
+        for i in range(start, len(layers)):
+            layer_start = time.perf_counter()
+            canvas = canvas.copy()
+            if layers[i].draw(canvas) is False:
+                cacheable = False
+            if cacheable:
+                self._set((size, mode, color) + tuple((l.name, l.key) for l in layers[:i + 1]), canvas)
+            timings[layers[i].name] = time.perf_counter() - layer_start
+        self.last_timings = timings
+        return canvas.copy()
+
+    def clear(self):
+        with self._lock:
+            self._cache.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"size": len(self._cache), "maxsize": self.maxsize, "hits": self.hits,
+                    "misses": self.misses, "last_redrawn": dict(self.last_timings)}
+
+
+# Shared by the renderers and feedback loops in the process
+compositor = LayerCompositor()
+
+# Anchor points of the agents' text `position` values on a width x height canvas
+TEXT_POSITIONS = {
+    "top-left": lambda w, h: (100, 100),
+    "top-center": lambda w, h: (w // 2, 100),
+    "center": lambda w, h: (w // 2, h // 2),
+    "bottom-center": lambda w, h: (w // 2, h - 150),
+}
+
+
+def image_layer(url: str) -> Layer:
+    """Full-canvas image from `url`, resized to the canvas when needed"""
+    def draw(canvas):
+        image = load_image(url).convert(canvas.mode)
+        if image.size != canvas.size:
+            image = image.resize(canvas.size, Image.Resampling.LANCZOS)
+        canvas.paste(image, (0, 0))
+    return Layer("image", (url,), draw)
+
+
+def text_block_layer(lines: list[tuple[str, object]], position: str = "top-left",
+                     fill="white", box=(0, 0, 0, 128)) -> Layer:
+    """Lines of (text, font) stacked from `position`, each on a shaded box"""
+    def draw(canvas):
+        painter = ImageDraw.Draw(canvas)
+        x, y = TEXT_POSITIONS.get(position, TEXT_POSITIONS["top-left"])(*canvas.size)
+        for text, font in lines:
+            bbox = painter.textbbox((x, y), text, font=font)
+            painter.rectangle(bbox, fill=box)
+            painter.text((x, y), text, font=font, fill=fill)
+            y += bbox[3] - bbox[1] + 20
+    key = (tuple((text, getattr(font, "path", None), getattr(font, "size", None)) for text, font in lines),
+           position, fill, box)
+    return Layer("text", key, draw)
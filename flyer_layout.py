@@ -0,0 +1,129 @@
+from dataclasses import dataclass
+from functools import lru_cache
+
+from PIL import Image
+
+from flyer_fonts import get_font, registry
+from flyer_text import draw_text
+
+LAYOUT_CACHE_SIZE = 1024
+
+
+@dataclass(frozen=True)
+class Line:
+    text: str
+    x: float  # offset inside the layout box, from the alignment
+    y: float
+    width: float
+
+
+@dataclass(frozen=True)
+class TextLayout:
+    """Measured lines of a text block; immutable so it can be reused across renders"""
+    font_name: str
+    size: int
+    lines: tuple[Line, ...]
+    box_width: int
+    line_height: int
+    height: int
+
+    @property
+    def font(self):
+        return get_font(self.font_name, self.size)
+
+    @property
+    def width(self) -> float:
+        return max((line.width for line in self.lines), default=0)
+
+    def fits(self, box_width: int, box_height: int = None) -> bool:
+        return self.width <= box_width and (box_height is None or self.height <= box_height)
+
+    def draw(self, canvas: Image.Image, origin: tuple[int, int], fill="#000000", **effects):
+        """Draw every line at `origin` (the box's top-left); effects go to flyer_text.draw_text"""
+        font = self.font
+        for line in self.lines:
+            draw_text(canvas, (origin[0] + line.x, origin[1] + line.y), line.text, font, fill=fill, **effects)
+
+
+def _split_long_word(word: str, metrics, max_width: float) -> list[str]:
+    """Break a word wider than the box between characters"""
+    parts, current = [], ""
+    for char in word:
+        if current and metrics.width(current + char) > max_width:
+            parts.append(current)
+            current = char
+        else:
+            current += char
+    return parts + [current]
+
+
+def break_lines(text: str, font, max_width: float) -> list[str]:
+    """Greedy line breaking on measured widths; explicit newlines start new paragraphs"""
+    metrics = registry.metrics(font)
+    space = metrics.advance(" ")
+    lines = []
+    for paragraph in text.split("\n"):
+        current, current_width = [], 0.0
+        for word in paragraph.split():
+            word_width = metrics.width(word)
+            if word_width > max_width:
+                pieces = _split_long_word(word, metrics, max_width)
+                if current:
+                    lines.append(" ".join(current))
+                lines.extend(pieces[:-1])
+                current, current_width = [pieces[-1]], metrics.width(pieces[-1])
+                continue
+            extra = word_width + (space if current else 0)
+            if current and current_width + extra > max_width:
+                lines.append(" ".join(current))
+                current, current_width = [word], word_width
+            else:
+                current.append(word)
+                current_width += extra
+        lines.append(" ".join(current))
+    return lines
+
+
+@lru_cache(maxsize=LAYOUT_CACHE_SIZE)
+def layout_text(text: str, font_name: str, size: int, box_width: int, alignment: str = "left",
+                line_spacing: int = 5) -> TextLayout:
+    """Break `text` into lines that fit `box_width` and position them for `alignment`"""
+    font = get_font(font_name, size)
+    ascent, descent = font.getmetrics()
+    line_height = ascent + descent + line_spacing
+    lines = []
+    for i, text_line in enumerate(break_lines(text, font, box_width)):
+        # Exact (kerned) width only once per final line, for alignment
+        width = font.getlength(text_line)
+        if alignment == "center":
+            x = (box_width - width) / 2
+        elif alignment == "right":
+            x = box_width - width
+        else:
+            x = 0
+        lines.append(Line(text_line, x, i * line_height, width))
+    height = len(lines) * line_height - line_spacing if lines else 0
+    return TextLayout(font_name, size, tuple(lines), box_width, line_height, height)
+
+
+@lru_cache(maxsize=LAYOUT_CACHE_SIZE)
+def fit_text(text: str, font_name: str, box: tuple[int, int], alignment: str = "left",
+             min_size: int = 8, max_size: int = 200, line_spacing: int = 5) -> TextLayout:
+    """Layout at the largest font size (binary search) whose lines fit inside `box`"""
+    box_width, box_height = box
+
+    def fits(size):
+        return layout_text(text, font_name, size, box_width, alignment, line_spacing).fits(box_width, box_height)
+
+    low, high = min_size, max_size
+    while low < high:
+        mid = (low + high + 1) // 2
+        if fits(mid):
+            low = mid
+        else:
+            high = mid - 1
+    return layout_text(text, font_name, low, box_width, alignment, line_spacing)
+
+
+def cache_info() -> dict:
+    return {"layout": layout_text.cache_info()._asdict(), "fit": fit_text.cache_info()._asdict()}
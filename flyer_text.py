@@ -0,0 +1,90 @@
+from dataclasses import dataclass
+
+import numpy as np
+from PIL import Image, ImageDraw, ImageFilter, ImageFont
+
+from flyer_backgrounds import hex_to_rgb, linear_gradient
+
+
+@dataclass(frozen=True)
+class Shadow:
+    offset: tuple[int, int] = (2, 2)
+    blur: float = 0
+    color: str = "#000000"
+    opacity: float = 0.5
+
+
+@dataclass(frozen=True)
+class Outline:
+    width: int = 2
+    color: str = "#000000"
+
+
+def _rgb(color) -> tuple:
+    return hex_to_rgb(color) if isinstance(color, str) else tuple(color[:3])
+
+
+def line_mask(text: str, font: ImageFont.FreeTypeFont, stroke_width: int = 0,
+              padding: int = 0) -> tuple[Image.Image, tuple[int, int]]:
+    """Rasterize a line once into an 'L' mask.
+
+    Returns the mask and the offset of its top-left corner relative to the
+    point the text would be drawn at with ImageDraw.text.
+    """
+    x0, y0, x1, y1 = font.getbbox(text, stroke_width=stroke_width)
+    mask = Image.new("L", (x1 - x0 + 2 * padding, y1 - y0 + 2 * padding), 0)
+    ImageDraw.Draw(mask).text((padding - x0, padding - y0), text, font=font, fill=255,
+                              stroke_width=stroke_width, stroke_fill=255)
+    return mask, (x0 - padding, y0 - padding)
+
+
+def _scaled(mask: Image.Image, opacity: float) -> Image.Image:
+    if opacity >= 1:
+        return mask
+    lut = np.rint(np.arange(256) * opacity).astype(np.uint8)
+    return mask.point(lut.tolist())
+
+
+def _pattern_fill(pattern: Image.Image, size: tuple[int, int]) -> Image.Image:
+    """Tile a pattern image over `size`"""
+    tile = np.asarray(pattern.convert("RGB"))
+    reps = (-(-size[1] // tile.shape[0]), -(-size[0] // tile.shape[1]), 1)
+    return Image.fromarray(np.tile(tile, reps)[:size[1], :size[0]], "RGB")
+
+
+def draw_text(canvas: Image.Image, xy: tuple[float, float], text: str, font: ImageFont.FreeTypeFont,
+              fill="#000000", gradient=None, gradient_angle: float = 0, pattern: Image.Image = None,
+              shadow: Shadow = None, outline: Outline = None):
+    """Draw one line of text with effects, compositing whole-line mask layers.
+
+    `gradient` takes color stops (see flyer_backgrounds.normalize_stops)
+    spread across the line's box; `pattern` is an image tiled inside the
+    glyphs. Shadow and outline are layers built from the same mask, so
+    each effect is a single paste regardless of the line length.
+    """
+    if not text:
+        return
+    x, y = round(xy[0]), round(xy[1])
+    # Room for the blur so the shadow is not clipped at the mask edges
+    pad = int(np.ceil(shadow.blur * 3)) if shadow is not None else 0
+    mask, (dx, dy) = line_mask(text, font, padding=pad)
+    if outline is not None:
+        stroke_mask, (sx, sy) = line_mask(text, font, outline.width, padding=pad)
+
+    if shadow is not None:
+        shadow_mask, (ox, oy) = (stroke_mask, (sx, sy)) if outline is not None else (mask, (dx, dy))
+        if shadow.blur:
+            shadow_mask = shadow_mask.filter(ImageFilter.GaussianBlur(shadow.blur))
+        canvas.paste(_rgb(shadow.color), (x + ox + shadow.offset[0], y + oy + shadow.offset[1]),
+                     _scaled(shadow_mask, shadow.opacity))
+
+    if outline is not None:
+        canvas.paste(_rgb(outline.color), (x + sx, y + sy), stroke_mask)
+
+    if gradient is not None:
+        layer = Image.fromarray(linear_gradient(mask.size, gradient, gradient_angle, cache=False), "RGB")
+    elif pattern is not None:
+        layer = _pattern_fill(pattern, mask.size)
+    else:
+        layer = _rgb(fill)
+    canvas.paste(layer, (x + dx, y + dy), mask)
@@ -0,0 +1,121 @@
+import queue
+import threading
+import time
+
+# Bound on items waiting between two stages; keeps memory flat for large batches
+PIPELINE_QUEUE_SIZE = 64
+
+_DONE = object()
+
+
+def _payload_size(item) -> int:
+    payload = item[-1] if isinstance(item, tuple) else item
+    if isinstance(payload, (bytes, bytearray, memoryview)):
+        return len(payload)
+    return getattr(payload, "nbytes", 0)
+
+
+class StageStats:
+    """Counters of one pipeline stage"""
+
+    def __init__(self, name: str, workers: int):
+        self.name = name
+        self.workers = workers
+        self.items = 0
+        self.errors = 0
+        self.bytes = 0
+        self.busy = 0.0
+        self.started = None
+        self.finished = None
+        self._lock = threading.Lock()
+
+    def record(self, seconds: float, nbytes: int = 0, error: bool = False):
+        with self._lock:
+            self.busy += seconds
+            if error:
+                self.errors += 1
+            else:
+                self.items += 1
+                self.bytes += nbytes
+
+    def as_dict(self) -> dict:
+        wall = (self.finished or time.perf_counter()) - (self.started or time.perf_counter())
+        return {
+            "stage": self.name,
+            "workers": self.workers,
+            "items": self.items,
+            "errors": self.errors,
+            "mb": round(self.bytes / 1e6, 2),
+            "wall_s": round(wall, 3),
+            "items_per_s": round(self.items / wall, 2) if wall else 0.0,
+            "mb_per_s": round(self.bytes / 1e6 / wall, 2) if wall else 0.0,
+            # Share of the stage's worker time spent working rather than waiting on queues
+            "utilization": round(self.busy / (wall * self.workers), 3) if wall else 0.0,
+        }
+
+
+def run_pipeline(source, stages, queue_size: int = PIPELINE_QUEUE_SIZE) -> dict:
+    """Run items from `source` through thread-pool stages joined by bounded queues.
+
+    `stages` is a list of (name, fn, workers). Each fn takes the previous
+    stage's output and returns the next item (None drops it). Failures are
+    counted per stage and reported with the failing item; they do not stop
+    the batch. Returns {"stages": [...], "failures": [(stage, item, error)]}.
+    """
+    queues = [queue.Queue(queue_size) for _ in stages]
+    stats = [StageStats(name, workers) for name, _, workers in stages]
+    remaining = [workers for _, _, workers in stages]
+    failures = []
+    lock = threading.Lock()
+
+    def worker(index):
+        name, fn, _ = stages[index]
+        stage = stats[index]
+        inbox = queues[index]
+        outbox = queues[index + 1] if index + 1 < len(stages) else None
+        while True:
+            item = inbox.get()
+            if item is _DONE:
+                break
+            start = time.perf_counter()
+            try:
+                result = fn(item)
+            except Exception as e:
+                stage.record(time.perf_counter() - start, error=True)
+                with lock:
+                    failures.append((name, item[0] if isinstance(item, tuple) else item, repr(e)))
+                continue
+            stage.record(time.perf_counter() - start, _payload_size(result) if result is not None else 0)
+            if result is not None and outbox is not None:
+                outbox.put(result)
+        with lock:
+            remaining[index] -= 1
+            last = remaining[index] == 0
+        if last:
+            stage.finished = time.perf_counter()
+            # The last worker out closes the next stage
+            if outbox is not None:
+                for _ in range(stages[index + 1][2]):
+                    outbox.put(_DONE)
+
+    threads = []
+    start = time.perf_counter()
+    for index, (name, _, workers) in enumerate(stages):
+        stats[index].started = start
+        for i in range(workers):
+            thread = threading.Thread(target=worker, args=(index,), name=f"{name}-{i}", daemon=True)
+            thread.start()
+            threads.append(thread)
+
+    try:
+        for item in source:
+            queues[0].put(item)
+    finally:
+        # Close the pipeline even when `source` fails (e.g. listing errors),
+        # so workers drain what they have and exit; the error then propagates
+        for _ in range(stages[0][2]):
+            queues[0].put(_DONE)
+        for thread in threads:
+            thread.join()
+    return {"stages": [s.as_dict() for s in stats], "failures": failures,
+            "seconds": round(time.perf_counter() - start, 3)}
@@ -0,0 +1,120 @@
+import json
+import logging
+import os
+import tempfile
+import threading
+from pathlib import Path
+
+import requests
+
+from llm_gateway import LLMGateway, request_key
+
+# "record": serve hits from disk and store misses; "replay": disk only, a
+# miss is an error (offline regression runs); "bypass": no caching
+LLM_CACHE_MODE = os.getenv("LLM_CACHE_MODE", "bypass")
+LLM_CACHE_DIR = os.getenv("LLM_CACHE_DIR", ".llm_cache")
+IMAGE_DOWNLOAD_TIMEOUT = float(os.getenv("LLM_CACHE_IMAGE_TIMEOUT", 60))
+
+MODES = ("record", "replay", "bypass")
+
+logger = logging.getLogger(__name__)
+
+
+class CacheMiss(LookupError):
+    """A replay-mode request that was never recorded"""
+
+
+def _atomic_write(path: Path, data: bytes):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=path.parent)
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        os.replace(tmp, path)
+    except BaseException:
+        os.unlink(tmp)
+        raise
+
+
+class ResponseCache:
+    """Disk cache of chat and image-generation responses.
+
+    Entries are keyed by kind, model, messages/prompt and parameters.
+    Generated images are stored as bytes next to their entry and served
+    as file:// URLs, so replays never touch the network.
+    """
+
+    def __init__(self, root: str = LLM_CACHE_DIR, mode: str = LLM_CACHE_MODE):
+        if mode not in MODES:
+            raise ValueError(f"LLM cache mode must be one of {MODES}, not {mode!r}")
+        self.root = Path(root)
+        self.mode = mode
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.recorded = 0
+
+    def _entry_path(self, key: str) -> Path:
+        return self.root / key[:2] / f"{key}.json"
+
+    def lookup(self, kind: str, model: str, payload, params: dict):
+        """Cached response, or None when it has to be requested"""
+        if self.mode == "bypass":
+            return None
+        key = request_key(kind, model, payload, params)
+        try:
+            entry = json.loads(self._entry_path(key).read_text())
+        except (OSError, ValueError):
+            with self._lock:
+                self.misses += 1
+            if self.mode == "replay":
+                raise CacheMiss(f"No recorded {kind} response for {model} ({key[:12]})")
+            return None
+        with self._lock:
+            self.hits += 1
+        if kind == "image" and entry.get("file"):
+            return (self.root / key[:2] / entry["file"]).resolve().as_uri()
+        return entry["response"]
+
+    def record(self, kind: str, model: str, payload, params: dict, response):
+        """Store a fresh response; returns what callers should use (a file URL for images)"""
+        if self.mode != "record":
+            return response
+        key = request_key(kind, model, payload, params)
+        entry = {"kind": kind, "model": model, "payload": payload, "params": params, "response": response}
+        result = response
+        if kind == "image":
+            # Keep the pixels: generated image URLs expire
+            try:
+                download = requests.get(response, timeout=IMAGE_DOWNLOAD_TIMEOUT)
+                download.raise_for_status()
+            except requests.RequestException as e:
+                logger.warning("Not caching image bytes for %s: %s", response, e)
+            else:
+                image_path = self._entry_path(key).with_suffix(".png")
+                _atomic_write(image_path, download.content)
+                entry["file"] = image_path.name
+                result = image_path.resolve().as_uri()
+        _atomic_write(self._entry_path(key), json.dumps(entry, default=str).encode())
+        with self._lock:
+            self.recorded += 1
+        return result
+
+    def cached(self, kind: str, model: str, payload, params: dict, call):
+        """Synchronous read-through for clients outside the gateway; `call()` makes the request"""
+        response = self.lookup(kind, model, payload, params)
+        if response is None:
+            response = self.record(kind, model, payload, params, call())
+        return response
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"mode": self.mode, "hits": self.hits, "misses": self.misses, "recorded": self.recorded}
+
+
+# Shared by the flyer agents' gateway and the direct API clients in the process
+cache = ResponseCache()
+
+# The flyer agents record and replay through this gateway; TableGen keeps
+# using the uncached llm_gateway.gateway, so replay runs never affect its SQL calls
+flyer_gateway = LLMGateway(cache=cache)
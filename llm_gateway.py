@@ -0,0 +1,239 @@
+import asyncio
+import hashlib
+import json
+import os
+import random
+import threading
+
+import httpx
+import openai
+from openai import AsyncOpenAI
+
+# "openai" talks to the API, "stub" answers locally and deterministically
+# (offline runs and throughput tests)
+LLM_BACKEND = os.getenv("LLM_BACKEND", "openai")
+LLM_TIMEOUT = float(os.getenv("LLM_TIMEOUT", 60))
+LLM_CONNECT_TIMEOUT = float(os.getenv("LLM_CONNECT_TIMEOUT", 5))
+LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", 3))
+LLM_RETRY_BASE = float(os.getenv("LLM_RETRY_BASE", 0.5))
+LLM_RETRY_CAP = float(os.getenv("LLM_RETRY_CAP", 20))
+# Requests sent concurrently; the rest wait for a slot
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", 16))
+LLM_MAX_CONNECTIONS = int(os.getenv("LLM_MAX_CONNECTIONS", 32))
+# Simulated latency of the stub backend in seconds
+LLM_STUB_LATENCY = float(os.getenv("LLM_STUB_LATENCY", 0))
+
+RETRYABLE_ERRORS = (
+    openai.APITimeoutError,
+    openai.APIConnectionError,
+    openai.RateLimitError,
+    openai.InternalServerError,
+)
+
+
+def request_key(kind: str, model: str, payload, params: dict) -> str:
+    """Stable hash of a request; keys both in-flight coalescing and the response cache"""
+    body = json.dumps([kind, model, payload, params], sort_keys=True, default=str)
+    return hashlib.sha256(body.encode()).hexdigest()
+
+
+def _retrieve_exception(task: asyncio.Task):
+    # Callers re-raise the error; if they all went away, don't log it as never retrieved
+    if not task.cancelled():
+        task.exception()
+
+
+class OpenAIBackend:
+    def __init__(self):
+        # One pooled HTTP client for all calls; the SDK's own retries are off
+        # because the gateway retries with jitter itself
+        self.http = httpx.AsyncClient(
+            timeout=httpx.Timeout(LLM_TIMEOUT, connect=LLM_CONNECT_TIMEOUT),
+            limits=httpx.Limits(max_connections=LLM_MAX_CONNECTIONS,
+                                max_keepalive_connections=LLM_MAX_CONNECTIONS),
+        )
+        self.client = AsyncOpenAI(http_client=self.http, max_retries=0)
+
+    async def chat(self, model: str, messages: list[dict], **params) -> str:
+        response = await self.client.chat.completions.create(model=model, messages=messages, **params)
+        return response.choices[0].message.content
+
+    async def image(self, model: str, prompt: str, **params) -> str:
+        response = await self.client.images.generate(model=model, prompt=prompt, **params)
+        return response.data[0].url
+
+    async def close(self):
+        await self.http.aclose()
+
+
+class StubBackend:
+    """Deterministic offline backend: the same request always gets the same answer.
+
+    `responder(model, messages, params)` can be set to return canned text
+    for a chat request (e.g. SQL for a benchmark); otherwise JSON requests
+    get a flyer text object and others a short digest-based string.
+    """
+
+    def __init__(self, latency: float = LLM_STUB_LATENCY, responder=None):
+        self.latency = latency
+        self.responder = responder
+
+    async def chat(self, model: str, messages: list[dict], **params) -> str:
+        await asyncio.sleep(self.latency)
+        if self.responder is not None:
+            return self.responder(model, messages, params)
+        digest = request_key("chat", model, messages, params)[:8]
+        if params.get("response_format", {}).get("type") == "json_object":
+            return json.dumps({
+                "headline": f"Stub headline {digest}",
+                "subtext": f"Stub subtext {digest}",
+                "position": "center",
+            })
+        return f"Stub response {digest}"
+
+    async def image(self, model: str, prompt: str, **params) -> str:
+        await asyncio.sleep(self.latency)
+        return f"https://stub.invalid/{request_key('image', model, prompt, params)[:16]}.png"
+
+    async def close(self):
+        pass
+
+
+class LLMGateway:
+    """Shared async entry point for chat and image generation.
+
+    All calls run on one background event loop so the HTTP pool, the
+    concurrency limit and the in-flight table are shared by async handlers
+    and synchronous callers (graph nodes, scripts) alike. Identical
+    requests that are already in flight are coalesced into one call.
+    Pass an llm_cache.ResponseCache as `cache` to record or replay responses.
+    """
+
+    def __init__(self, backend: str = LLM_BACKEND, max_concurrency: int = LLM_MAX_CONCURRENCY,
+                 max_retries: int = LLM_MAX_RETRIES, cache=None):
+        self.backend_name = backend
+        self.cache = cache
+        self.max_concurrency = max_concurrency
+        self.max_retries = max_retries
+        self.backend = None
+        self._semaphore = None
+        self._loop = None
+        self._pid = None
+        self._lock = threading.Lock()
+        self._in_flight: dict[str, asyncio.Task] = {}
+        self.requests = 0
+        self.calls = 0
+        self.coalesced = 0
+        self.retries = 0
+        self.failures = 0
+
+    # ---- event loop ----
+    def _ensure_loop(self) -> asyncio.AbstractEventLoop:
+        with self._lock:
+            # The loop thread does not survive a fork, so forked workers start their own
+            if self._loop is None or self._pid != os.getpid():
+                self._loop = asyncio.new_event_loop()
+                self._pid = os.getpid()
+                self._in_flight = {}
+                threading.Thread(target=self._loop.run_forever, name="llm-gateway", daemon=True).start()
+                asyncio.run_coroutine_threadsafe(self._start(), self._loop).result()
+            return self._loop
+
+    async def _start(self):
+        self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        self.backend = StubBackend() if self.backend_name == "stub" else OpenAIBackend()
+
+    def _submit(self, coro):
+        return asyncio.run_coroutine_threadsafe(coro, self._ensure_loop())
+
+    # ---- calls ----
+    async def _call(self, kind: str, model: str, payload, params: dict):
+        """Runs on the gateway loop: disk cache, coalesce, then call the backend with retries"""
+        self.requests += 1
+        if self.cache is not None and self.cache.mode != "bypass":
+            # Entries are files; reading them must not stall the other calls on this loop
+            cached = await asyncio.to_thread(self.cache.lookup, kind, model, payload, params)
+            if cached is not None:
+                return cached
+        key = request_key(kind, model, payload, params)
+        task = self._in_flight.get(key)
+        if task is not None:
+            self.coalesced += 1
+        else:
+            # The call is a task of its own: a caller that is cancelled (e.g. a
+            # client went away) stops waiting, but never fails the other callers
+            task = asyncio.ensure_future(self._fetch(key, kind, model, payload, params))
+            task.add_done_callback(_retrieve_exception)
+            self._in_flight[key] = task
+        return await asyncio.shield(task)
+
+    async def _fetch(self, key: str, kind: str, model: str, payload, params: dict):
+        try:
+            result = await self._call_with_retries(kind, model, payload, params)
+            if self.cache is not None and self.cache.mode == "record":
+                # Image recording downloads the pixels, so keep it off the loop
+                result = await asyncio.to_thread(self.cache.record, kind, model, payload, params, result)
+            return result
+        finally:
+            del self._in_flight[key]
+
+    async def _call_with_retries(self, kind: str, model: str, payload, params: dict):
+        method = self.backend.chat if kind == "chat" else self.backend.image
+        for attempt in range(self.max_retries + 1):
+            try:
+                async with self._semaphore:
+                    self.calls += 1
+                    return await method(model, payload, **params)
+            except RETRYABLE_ERRORS:
+                if attempt == self.max_retries:
+                    self.failures += 1
+                    raise
+                self.retries += 1
+                # Full jitter keeps retrying clients from stampeding together
+                await asyncio.sleep(random.uniform(0, min(LLM_RETRY_CAP, LLM_RETRY_BASE * 2 ** attempt)))
+            except Exception:
+                self.failures += 1
+                raise
+
+    async def chat(self, model: str, messages: list[dict], **params) -> str:
+        """Chat completion text; safe to await from any event loop"""
+        return await asyncio.wrap_future(self._submit(self._call("chat", model, messages, params)))
+
+    async def image(self, model: str, prompt: str, **params) -> str:
+        """URL of a generated image"""
+        return await asyncio.wrap_future(self._submit(self._call("image", model, prompt, params)))
+
+    def chat_sync(self, model: str, messages: list[dict], **params) -> str:
+        return self._submit(self._call("chat", model, messages, params)).result()
+
+    def image_sync(self, model: str, prompt: str, **params) -> str:
+        return self._submit(self._call("image", model, prompt, params)).result()
+
+    def set_stub_responder(self, responder):
+        """Install canned chat answers for the stub backend"""
+        self._ensure_loop()
+        if not isinstance(self.backend, StubBackend):
+            raise RuntimeError("A responder can only be set on the stub backend")
+        self.backend.responder = responder
+
+    def close(self):
+        if self._loop is not None:
+            asyncio.run_coroutine_threadsafe(self.backend.close(), self._loop).result()
+            self._loop.call_soon_threadsafe(self._loop.stop)
+            self._loop = None
+
+    def stats(self) -> dict:
+        return {
+            "backend": self.backend_name,
+            "requests": self.requests,
+            "backend_calls": self.calls,
+            "coalesced": self.coalesced,
+            "retries": self.retries,
+            "failures": self.failures,
+            "in_flight": len(self._in_flight),
+            "cache": self.cache.stats() if self.cache is not None else None,
+        }
+
+
+# Shared by every module in the process
+gateway = LLMGateway()
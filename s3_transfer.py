@@ -0,0 +1,118 @@
+import os
+import re
+import threading
+from io import BytesIO
+from urllib.parse import unquote, urlparse
+
+import boto3
+import cv2
+import numpy as np
+import requests
+from boto3.s3.transfer import TransferConfig
+from botocore.config import Config
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+# Point at a local S3 stand-in (moto server, MinIO) for testing
+S3_ENDPOINT_URL = os.getenv("S3_ENDPOINT_URL")
+# Shared by the download and upload pools of batch runs
+S3_MAX_POOL_CONNECTIONS = int(os.getenv("S3_MAX_POOL_CONNECTIONS", 64))
+# Uploads above the threshold go multipart, with parts sent in parallel
+S3_MULTIPART_THRESHOLD = int(os.getenv("S3_MULTIPART_THRESHOLD", 8 * 1024 * 1024))
+S3_MULTIPART_CHUNKSIZE = int(os.getenv("S3_MULTIPART_CHUNKSIZE", 8 * 1024 * 1024))
+S3_MAX_CONCURRENCY = int(os.getenv("S3_MAX_CONCURRENCY", 10))
+HTTP_TIMEOUT = float(os.getenv("S3_HTTP_TIMEOUT", 60))
+HTTP_RETRIES = int(os.getenv("S3_HTTP_RETRIES", 3))
+
+TRANSFER_CONFIG = TransferConfig(
+    multipart_threshold=S3_MULTIPART_THRESHOLD,
+    multipart_chunksize=S3_MULTIPART_CHUNKSIZE,
+    max_concurrency=S3_MAX_CONCURRENCY,
+    use_threads=True,
+)
+
+# bucket.s3.amazonaws.com, bucket.s3.us-east-1.amazonaws.com, bucket.s3-us-west-2.amazonaws.com
+VIRTUAL_HOST = re.compile(r"^(?P<bucket>.+)\.s3[.-](?:[a-z0-9-]+\.)?amazonaws\.com$")
+PATH_HOST = re.compile(r"^s3[.-](?:[a-z0-9-]+\.)?amazonaws\.com$")
+
+_session = None
+_session_lock = threading.Lock()
+
+
+def http_session() -> requests.Session:
+    """Process-wide session with pooled keep-alive connections and retries on 5xx"""
+    global _session
+    with _session_lock:
+        if _session is None:
+            retry = Retry(total=HTTP_RETRIES, backoff_factor=0.5,
+                          status_forcelist=(500, 502, 503, 504), allowed_methods=("GET", "HEAD"))
+            adapter = HTTPAdapter(pool_connections=S3_MAX_POOL_CONNECTIONS,
+                                  pool_maxsize=S3_MAX_POOL_CONNECTIONS, max_retries=retry)
+            _session = requests.Session()
+            _session.mount("http://", adapter)
+            _session.mount("https://", adapter)
+        return _session
+
+
+def s3_client(aws_access_key=None, aws_secret_key=None, region='us-east-1', endpoint_url=S3_ENDPOINT_URL):
+    return boto3.client(
+        's3',
+        aws_access_key_id=aws_access_key,
+        aws_secret_access_key=aws_secret_key,
+        region_name=region,
+        endpoint_url=endpoint_url,
+        config=Config(max_pool_connections=S3_MAX_POOL_CONNECTIONS)
+    )
+
+
+def parse_presigned_url(url: str) -> tuple[str, str]:
+    """(bucket, key) of a presigned S3 URL, virtual-hosted or path-style.
+
+    Hosts other than amazonaws.com (MinIO, moto) are treated as path-style.
+    """
+    parsed = urlparse(url)
+    host = parsed.hostname or ""
+    path = unquote(parsed.path.lstrip("/"))
+    match = VIRTUAL_HOST.match(host)
+    if match:
+        bucket, key = match.group("bucket"), path
+    else:
+        bucket, _, key = path.partition("/")
+        if not PATH_HOST.match(host) and host.endswith("amazonaws.com"):
+            raise ValueError(f"Not an S3 URL: {url}")
+    if not bucket or not key:
+        raise ValueError(f"No bucket and key in URL: {url}")
+    return bucket, key
+
+
+def download_bytes(url: str) -> bytes:
+    """Body of a (presigned) URL over the pooled session"""
+    response = http_session().get(url, timeout=HTTP_TIMEOUT)
+    if response.status_code != 200:
+        raise ValueError(f"Failed to download {url}: HTTP {response.status_code}")
+    return response.content
+
+
+def read_object(s3, bucket: str, key: str) -> bytes:
+    return s3.get_object(Bucket=bucket, Key=key)['Body'].read()
+
+
+def decode_image(data: bytes, flags: int = cv2.IMREAD_COLOR) -> np.ndarray:
+    """Decode straight from the downloaded buffer (no bytearray copy)"""
+    img = cv2.imdecode(np.frombuffer(data, dtype=np.uint8), flags)
+    if img is None:
+        raise ValueError("Failed to decode image")
+    return img
+
+
+def upload_bytes(s3, data: bytes, bucket: str, key: str, content_type: str = None, extra_args: dict = None):
+    """Upload through the transfer manager: multipart with parallel parts for large bodies"""
+    args = dict(extra_args or {})
+    if content_type:
+        args['ContentType'] = content_type
+    s3.upload_fileobj(BytesIO(data), bucket, key, ExtraArgs=args, Config=TRANSFER_CONFIG)
+
+
+def generate_presigned_url(s3, bucket: str, key: str, expires_in: int = 3600) -> str:
+    return s3.generate_presigned_url('get_object', Params={'Bucket': bucket, 'Key': key},
+                                     ExpiresIn=expires_in)
@@ -0,0 +1,273 @@
+"""Offline load test for the TableGen apps.
+
+Generates synthetic CSV/Excel datasets, loads TableGen1 or TableGen2
+in-process with a stub (or recorded) LLM and drives /upload/, /query/
+and /edit/ concurrently through an ASGI transport. Reports upload MB/s,
+query/edit latency percentiles and peak RSS per scale.
+
+    python tablegen_bench.py --app TableGen2 --scales small,medium --requests 200
+"""
+import argparse
+import asyncio
+import importlib.util
+import json
+import multiprocessing
+import os
+import re
+import tempfile
+import threading
+import time
+from importlib.machinery import SourceFileLoader
+
+# Must be set before the app and its modules are imported
+os.environ.setdefault("LLM_BACKEND", "stub")
+os.environ.setdefault("TABLEGEN_CATALOG_DIR", tempfile.mkdtemp(prefix="tablegen_bench_"))
+
+import httpx
+import numpy as np
+import pandas as pd
+
+from llm_gateway import gateway
+from tablegen_cache import sql_cache, result_cache
+
+SCALES = {"small": 10_000, "medium": 200_000, "large": 2_000_000}
+# Excel is generated smaller: a workbook of EXCEL_SHEETS sheets
+EXCEL_SHEETS = 8
+EXCEL_MAX_ROWS_PER_SHEET = 50_000
+
+# Prompt -> SQL template answered by the stub LLM
+QUERIES = {
+    "total revenue by region": "SELECT region, sum(qty * price) AS revenue FROM {table} GROUP BY region ORDER BY revenue DESC",
+    "top products by quantity": "SELECT product, sum(qty) AS qty FROM {table} GROUP BY product ORDER BY qty DESC LIMIT 20",
+    "monthly revenue": "SELECT date_trunc('month', order_date) AS month, sum(qty * price) AS revenue FROM {table} GROUP BY 1 ORDER BY 1",
+    "all orders": "SELECT * FROM {table}",
+}
+# Edit request -> actions answered by the stub LLM (valid on top of 'all orders')
+EDITS = {
+    "only large orders": [{"action": "filter_rows", "condition": "qty > 5"}],
+    "show price with two decimals": [{"action": "format_column", "column": "price", "format_string": "{x:.2f}"}],
+    "remove the region column": [{"action": "drop_column", "column": "region"}],
+    "call qty quantity": [{"action": "rename_column", "old_name": "qty", "new_name": "quantity"}],
+}
+
+
+# ------------ data ------------
+def synthetic_frame(rows: int, seed: int = 0) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({
+        "order_id": np.arange(rows),
+        "region": rng.choice(["north", "south", "east", "west"], rows),
+        "product": rng.choice([f"product_{i}" for i in range(200)], rows),
+        "qty": rng.integers(1, 10, rows),
+        "price": rng.uniform(1, 500, rows).round(2),
+        "order_date": pd.Timestamp("2024-01-01") + pd.to_timedelta(rng.integers(0, 365, rows), unit="D"),
+    })
+
+
+def generate_datasets(data_dir: str, scale: str) -> dict[str, str]:
+    """Write (or reuse) the CSV and Excel files of a scale"""
+    os.makedirs(data_dir, exist_ok=True)
+    rows = SCALES[scale]
+    csv_path = os.path.join(data_dir, f"sales_{scale}.csv")
+    xlsx_path = os.path.join(data_dir, f"sales_{scale}_book.xlsx")
+    if not os.path.exists(csv_path):
+        synthetic_frame(rows).to_csv(csv_path, index=False)
+    if not os.path.exists(xlsx_path):
+        sheet_rows = min(rows // EXCEL_SHEETS, EXCEL_MAX_ROWS_PER_SHEET)
+        with pd.ExcelWriter(xlsx_path) as writer:
+            for i in range(EXCEL_SHEETS):
+                synthetic_frame(sheet_rows, seed=i).to_excel(writer, sheet_name=f"sheet_{i}", index=False)
+    return {"csv": csv_path, "xlsx": xlsx_path}
+
+
+# ------------ LLM ------------
+def make_responder(recorded: dict):
+    """Stub answers: recorded responses first, then the QUERIES/EDITS tables"""
+    def respond(model, messages, params):
+        content = messages[-1]["content"]
+        request = re.search(r"User request: (.*)", content)
+        if request:
+            request = request.group(1).strip()
+            if request in recorded:
+                return recorded[request]
+            return json.dumps(EDITS.get(request, []))
+        if content in recorded:
+            return recorded[content]
+        prompt, table = re.match(r"(.*) from (\w+)$", content).groups()
+        return f"```sql\n{QUERIES[prompt].format(table=table)}\n```"
+    return respond
+
+
+# ------------ measuring ------------
+class RSSSampler:
+    """Peak resident memory of this process plus its children (e.g. the Excel pool)"""
+
+    def __init__(self, interval: float = 0.05):
+        self.interval = interval
+        self.peak = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    @staticmethod
+    def _rss(pid) -> int:
+        try:
+            with open(f"/proc/{pid}/status") as f:
+                for line in f:
+                    if line.startswith("VmRSS:"):
+                        return int(line.split()[1]) * 1024
+        except OSError:
+            pass
+        return 0
+
+    def sample(self) -> int:
+        return self._rss("self") + sum(self._rss(p.pid) for p in multiprocessing.active_children())
+
+    def _run(self):
+        while not self._stop.is_set():
+            self.peak = max(self.peak, self.sample())
+            time.sleep(self.interval)
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+        self.peak = max(self.peak, self.sample())
+
+
+def percentile(values: list[float], q: float) -> float | None:
+    if not values:
+        return None
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(q / 100 * (len(values) - 1))))]
+
+
+def load_app(script: str):
+    """Import one of the extension-less TableGen scripts as a module"""
+    loader = SourceFileLoader(os.path.basename(script).lower(), script)
+    spec = importlib.util.spec_from_loader(loader.name, loader)
+    module = importlib.util.module_from_spec(spec)
+    loader.exec_module(module)
+    return module.app
+
+
+# ------------ scenarios ------------
+async def timed(latencies: list, errors: list, request):
+    start = time.perf_counter()
+    response = await request
+    latencies.append((time.perf_counter() - start) * 1000)
+    if response.status_code >= 400:
+        errors.append(f"{response.status_code}: {response.text[:200]}")
+    return response
+
+
+async def upload(client: httpx.AsyncClient, path: str, headers: dict) -> dict:
+    size = os.path.getsize(path)
+    errors = []
+    with open(path, "rb") as f:
+        start = time.perf_counter()
+        response = await client.post("/upload/", files={"files": (os.path.basename(path), f)}, headers=headers)
+        elapsed = time.perf_counter() - start
+    if response.status_code >= 400:
+        errors.append(response.text[:200])
+    return {"mb": round(size / 1e6, 2), "mb_s": round(size / 1e6 / elapsed, 2), "errors": errors}
+
+
+async def run_scenario(client: httpx.AsyncClient, app_name: str, scale: str, files: dict,
+                       requests: int, concurrency: int, cold: bool) -> dict:
+    edits = app_name == "TableGen2"
+    table = f"sales_{scale}"
+    semaphore = asyncio.Semaphore(concurrency)
+    query_ms, edit_ms, errors = [], [], []
+
+    with RSSSampler() as rss:
+        headers = {"X-Session-ID": f"bench-{scale}-upload"}
+        csv_upload = await upload(client, files["csv"], headers)
+        xlsx_upload = await upload(client, files["xlsx"], headers)
+
+        prompts = list(QUERIES)
+        edit_requests = list(EDITS)
+
+        async def user(i: int):
+            async with semaphore:
+                if cold:
+                    sql_cache.clear()
+                    result_cache.clear()
+                headers = {"X-Session-ID": f"bench-{scale}-{i}"}
+                # Sessions that edit start from the full table
+                prompt = "all orders" if edits else prompts[i % len(prompts)]
+                await timed(query_ms, errors, client.post(
+                    "/query/", params={"prompt": f"{prompt} from {table}"}, headers=headers))
+                if edits:
+                    await timed(edit_ms, errors, client.post(
+                        "/edit/", params={"request": edit_requests[i % len(edit_requests)]}, headers=headers))
+
+        start = time.perf_counter()
+        await asyncio.gather(*(user(i) for i in range(requests)))
+        elapsed = time.perf_counter() - start
+
+    result = {
+        "app": app_name,
+        "scale": scale,
+        "rows": SCALES[scale],
+        "csv_mb": csv_upload["mb"],
+        "csv_upload_mb_s": csv_upload["mb_s"],
+        "xlsx_mb": xlsx_upload["mb"],
+        "xlsx_upload_mb_s": xlsx_upload["mb_s"],
+        "requests": requests,
+        "requests_per_s": round(requests / elapsed, 1),
+        "query_p50_ms": percentile(query_ms, 50),
+        "query_p99_ms": percentile(query_ms, 99),
+        "peak_rss_mb": round(rss.peak / 1e6, 1),
+        "errors": len(errors) + len(csv_upload["errors"]) + len(xlsx_upload["errors"]),
+    }
+    if edits:
+        result["edit_p50_ms"] = percentile(edit_ms, 50)
+        result["edit_p99_ms"] = percentile(edit_ms, 99)
+    for key, value in result.items():
+        if isinstance(value, float):
+            result[key] = round(value, 1)
+    first_errors = csv_upload["errors"] + xlsx_upload["errors"] + errors
+    if first_errors:
+        result["first_error"] = first_errors[0]
+    return result
+
+
+async def main(args):
+    recorded = {}
+    if args.recorded:
+        with open(args.recorded) as f:
+            recorded = json.load(f)
+    if gateway.backend_name == "stub":
+        gateway.set_stub_responder(make_responder(recorded))
+
+    app = load_app(args.app)
+    transport = httpx.ASGITransport(app=app)
+    results = []
+    async with httpx.AsyncClient(transport=transport, base_url="http://tablegen", timeout=None) as client:
+        for scale in args.scales.split(","):
+            files = generate_datasets(args.data_dir, scale)
+            result = await run_scenario(client, os.path.basename(args.app), scale, files,
+                                        args.requests, args.concurrency, args.cold)
+            result["llm"] = gateway.stats()
+            results.append(result)
+            print(json.dumps(result))
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Offline TableGen load test")
+    parser.add_argument("--app", default="TableGen1", help="path of the TableGen script to load")
+    parser.add_argument("--scales", default="small,medium", help=f"comma-separated, from {', '.join(SCALES)}")
+    parser.add_argument("--requests", type=int, default=100, help="query (and edit) sessions per scale")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--cold", action="store_true", help="clear the SQL/result caches before every query")
+    parser.add_argument("--recorded", help="JSON file mapping prompts/edit requests to recorded LLM responses")
+    parser.add_argument("--data-dir", default=os.path.join(tempfile.gettempdir(), "tablegen_bench_data"))
+    parser.add_argument("--output", help="write all results to this JSON file")
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,93 @@
+import hashlib
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+
+SQL_CACHE_SIZE = int(os.getenv("TABLEGEN_SQL_CACHE_SIZE", 512))
+RESULT_CACHE_SIZE = int(os.getenv("TABLEGEN_RESULT_CACHE_SIZE", 64))
+CACHE_TTL = float(os.getenv("TABLEGEN_CACHE_TTL", 600))
+# Results larger than this are recomputed rather than pinned in the cache
+RESULT_CACHE_MAX_ROWS = int(os.getenv("TABLEGEN_RESULT_CACHE_MAX_ROWS", 100_000))
+
+
+class TTLCache:
+    """Thread-safe LRU cache whose entries also expire after `ttl` seconds"""
+
+    def __init__(self, maxsize: int = 256, ttl: float = 600):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                self.misses += 1
+                return default
+            value, expires_at = entry
+            if expires_at < time.monotonic():
+                del self._data[key]
+                self.expirations += 1
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key, value):
+        with self._lock:
+            self._data[key] = (value, time.monotonic() + self.ttl)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._data),
+            "maxsize": self.maxsize,
+            "ttl": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
+
+
+def normalize_prompt(prompt: str) -> str:
+    """Whitespace-insensitive form of a prompt used as cache key.
+
+    Only runs of whitespace are collapsed: case, quotes and punctuation can
+    change the SQL (string literals, operators), so they stay part of the key.
+    """
+    return re.sub(r"\s+", " ", prompt).strip()
+
+
+def schema_hash(schema: str) -> str:
+    return hashlib.sha256(schema.encode()).hexdigest()[:16]
+
+
+# Generated SQL keyed by (normalized prompt, schema hash)
+sql_cache = TTLCache(SQL_CACHE_SIZE, CACHE_TTL)
+# Arrow query results keyed by (sql, data version)
+result_cache = TTLCache(RESULT_CACHE_SIZE, CACHE_TTL)
+
+
+def cache_stats() -> dict:
+    return {"sql": sql_cache.stats(), "results": result_cache.stats()}
@@ -0,0 +1,197 @@
+import fcntl
+import json
+import os
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+
+import duckdb
+from fastapi import UploadFile
+
+from tablegen_ingest import ingest_upload, ingest_uploads, quote_ident, sql_literal
+from tablegen_governor import duckdb_config
+
+CATALOG_DIR = os.getenv("TABLEGEN_CATALOG_DIR", "tablegen_catalog")
+# Seconds a replaced Parquet file is kept for queries and streams still reading it
+RETIRED_FILE_GRACE = float(os.getenv("TABLEGEN_RETIRED_FILE_GRACE", 600))
+
+
+class SharedCatalog:
+    """Uploaded tables stored as Parquet files plus a JSON manifest.
+
+    Every worker process on the box opens its own in-memory DuckDB
+    connection and exposes the manifest's tables as views over the Parquet
+    files, so an upload handled by one worker is visible to all of them.
+    The manifest version doubles as the data version for caches and cursors.
+    """
+
+    def __init__(self, path: str = CATALOG_DIR, on_change=None, grace: float = RETIRED_FILE_GRACE):
+        self.path = path
+        self.grace = grace
+        self.table_dir = os.path.join(path, "tables")
+        self.manifest_path = os.path.join(path, "manifest.json")
+        self.lock_path = os.path.join(path, "catalog.lock")
+        os.makedirs(self.table_dir, exist_ok=True)
+        # on_change(conn, name, entry) is called when a table appears or
+        # changes; entry is None when it was removed
+        self.on_change = on_change
+        self.tables: dict[str, dict] = {}
+        self._version = 0
+        self._manifest_mtime = None
+        self._conn = None
+        self._pid = None
+        self._refresh_lock = threading.RLock()
+
+    def _connection(self) -> duckdb.DuckDBPyConnection:
+        # Connections must not cross a fork, so each worker opens its own
+        if self._conn is None or self._pid != os.getpid():
+            self._conn = duckdb.connect(config=duckdb_config())
+            self._pid = os.getpid()
+            self.tables = {}
+            self._manifest_mtime = None
+        return self._conn
+
+    @property
+    def conn(self) -> duckdb.DuckDBPyConnection:
+        self.refresh()
+        return self._conn
+
+    def cursor(self) -> duckdb.DuckDBPyConnection:
+        return self.conn.cursor()
+
+    @property
+    def version(self) -> int:
+        self.refresh()
+        return self._version
+
+    # ---- manifest ----
+    @contextmanager
+    def _locked(self):
+        with open(self.lock_path, "a") as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock, fcntl.LOCK_UN)
+
+    def _read_manifest(self) -> dict:
+        try:
+            with open(self.manifest_path) as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {"version": 0, "tables": {}}
+
+    def _write_manifest(self, manifest: dict):
+        tmp = f"{self.manifest_path}.{os.getpid()}.tmp"
+        with open(tmp, "w") as f:
+            json.dump(manifest, f)
+        os.replace(tmp, self.manifest_path)
+
+    def refresh(self):
+        """Sync this worker's views with the manifest if another worker changed it"""
+        conn = self._connection()
+        try:
+            mtime = os.stat(self.manifest_path).st_mtime_ns
+        except FileNotFoundError:
+            return
+        with self._refresh_lock:
+            if mtime == self._manifest_mtime:
+                return
+            manifest = self._read_manifest()
+            self._manifest_mtime = mtime
+            self._version = manifest["version"]
+            current = manifest["tables"]
+
+            for name in set(self.tables) - set(current):
+                conn.execute(f"DROP VIEW IF EXISTS {quote_ident(name)}")
+                del self.tables[name]
+                if self.on_change:
+                    self.on_change(conn, name, None)
+            for name, entry in current.items():
+                known = self.tables.get(name)
+                if known is not None and known["file"] == entry["file"]:
+                    known.update(entry)  # metadata only
+                    continue
+                self._create_view(conn, name, entry["file"])
+                self.tables[name] = entry
+                if self.on_change:
+                    self.on_change(conn, name, entry)
+
+    def _create_view(self, conn: duckdb.DuckDBPyConnection, name: str, file: str):
+        path = os.path.join(self.table_dir, file)
+        conn.execute(
+            f"CREATE OR REPLACE VIEW {quote_ident(name)} AS "
+            f"SELECT * FROM read_parquet({sql_literal(path)})"
+        )
+
+    # ---- writing ----
+    def publish(self, conn: duckdb.DuckDBPyConnection, name: str, select_sql: str):
+        """Write the result of `select_sql` as the new version of table `name`.
+
+        Blocking; run it in a thread on a cursor of its own (the ingest
+        helpers do). This worker's views pick the new file up on the next
+        refresh, on the thread that owns the catalog connection.
+        """
+        safe = "".join(c if c.isalnum() else "_" for c in name)
+        file = f"{safe}-{uuid.uuid4().hex[:12]}.parquet"
+        conn.execute(
+            f"COPY ({select_sql}) TO {sql_literal(os.path.join(self.table_dir, file))} (FORMAT parquet)"
+        )
+        with self._locked():
+            manifest = self._read_manifest()
+            old = manifest["tables"].get(name)
+            manifest["tables"][name] = {"file": file, "updated": time.time()}
+            manifest["version"] += 1
+            if old is not None:
+                # Other workers' views and in-flight streams still point at the
+                # old file, so it is only deleted once the grace period is over
+                manifest.setdefault("retired", []).append({"file": old["file"], "retired": time.time()})
+            self._sweep_retired(manifest)
+            self._write_manifest(manifest)
+
+    def _sweep_retired(self, manifest: dict):
+        """Delete replaced files older than the grace period; call with the lock held"""
+        cutoff = time.time() - self.grace
+        keep = []
+        for entry in manifest.get("retired", []):
+            if entry["retired"] > cutoff:
+                keep.append(entry)
+                continue
+            try:
+                os.remove(os.path.join(self.table_dir, entry["file"]))
+            except FileNotFoundError:
+                pass
+        manifest["retired"] = keep
+
+    def set_metadata(self, name: str, **metadata):
+        """Attach metadata (e.g. a schema profile) to a table without bumping the data version"""
+        with self._locked():
+            manifest = self._read_manifest()
+            if name in manifest["tables"]:
+                manifest["tables"][name].update(metadata)
+                self._write_manifest(manifest)
+        self.refresh()
+
+    async def ingest_upload(self, file: UploadFile, sheet_prefix: str = None) -> list[str]:
+        """Stream an upload straight into the shared catalog as Parquet"""
+        tables = await ingest_upload(self.conn, file, sheet_prefix, create=self.publish)
+        self.refresh()
+        return tables
+
+    async def ingest_uploads(self, files: list[UploadFile], filename_prefix: bool = False) -> list[str]:
+        """Ingest several uploads, parsing Excel sheets in parallel, straight into the catalog"""
+        tables = await ingest_uploads(self.conn, files, filename_prefix, create=self.publish)
+        self.refresh()
+        return tables
+
+    def describe(self) -> dict:
+        self.refresh()
+        return {
+            name: {
+                "file": entry["file"],
+                "bytes": os.path.getsize(os.path.join(self.table_dir, entry["file"])),
+                "updated": entry["updated"],
+            }
+            for name, entry in self.tables.items()
+        }
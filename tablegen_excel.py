@@ -0,0 +1,134 @@
+import asyncio
+import multiprocessing
+import os
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from importlib.util import find_spec
+
+import pandas as pd
+import pyarrow as pa
+
+# python-calamine (Rust) parses workbooks several times faster than openpyxl;
+# it is used whenever it is installed unless an engine is set explicitly
+EXCEL_ENGINE = os.getenv("TABLEGEN_EXCEL_ENGINE") or ("calamine" if find_spec("python_calamine") else None)
+EXCEL_WORKERS = int(os.getenv("TABLEGEN_EXCEL_WORKERS", 0)) or os.cpu_count() or 1
+
+_executor = None
+_executor_pid = None
+
+
+def executor() -> ProcessPoolExecutor:
+    """Process pool for sheet parsing, created lazily in each server process"""
+    global _executor, _executor_pid
+    if _executor is None or _executor_pid != os.getpid():
+        # The server runs threads (uvicorn, DuckDB), so forking it could copy a held
+        # lock into a child; workers start from a clean forkserver process instead
+        _executor = ProcessPoolExecutor(EXCEL_WORKERS, mp_context=multiprocessing.get_context("forkserver"))
+        _executor_pid = os.getpid()
+    return _executor
+
+
+def sheet_names(path: str, engine: str = EXCEL_ENGINE) -> list[str]:
+    with pd.ExcelFile(path, engine=engine) as xls:
+        return xls.sheet_names
+
+
+def to_arrow(df: pd.DataFrame) -> pa.Table:
+    """Convert a parsed sheet to Arrow; this is the only place dtypes are inferred"""
+    try:
+        return pa.Table.from_pandas(df, preserve_index=False)
+    except (pa.ArrowTypeError, pa.ArrowInvalid):
+        # Hand-made sheets often mix numbers and text in a column; keep those as text
+        df = df.copy()
+        for column in df.columns[df.dtypes == object]:
+            values = df[column]
+            df[column] = values.where(values.isna(), values.astype(str))
+        return pa.Table.from_pandas(df, preserve_index=False)
+
+
+def read_sheets(path: str, sheets: list[str], engine: str = EXCEL_ENGINE,
+                out_dir: str = None) -> list[tuple[str, str]]:
+    """Parse `sheets` of a workbook into Arrow IPC files and return (sheet, file) pairs.
+
+    Runs in a pool worker; the workbook is opened once per batch of sheets
+    and results go through uncompressed IPC files that the parent maps
+    without copying, instead of being pickled back.
+    """
+    results = []
+    with pd.ExcelFile(path, engine=engine) as xls:
+        for sheet in sheets:
+            table = to_arrow(xls.parse(sheet))
+            fd, out = tempfile.mkstemp(suffix=".arrow", dir=out_dir)
+            with os.fdopen(fd, "wb") as sink, pa.ipc.new_file(sink, table.schema) as writer:
+                writer.write_table(table)
+            results.append((sheet, out))
+    return results
+
+
+def _remove(path: str):
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+
+def _remove_outputs(job):
+    """Done-callback for abandoned read_sheets jobs"""
+    if not job.cancelled() and job.exception() is None:
+        for _, out in job.result():
+            _remove(out)
+
+
+def load_arrow(path: str) -> pa.Table:
+    """Memory-map an IPC file written by `read_sheets`"""
+    with pa.memory_map(path) as source:
+        return pa.ipc.open_file(source).read_all()
+
+
+async def parse_workbooks(paths: list[str], engine: str = EXCEL_ENGINE, out_dir: str = None):
+    """Parse all sheets of several workbooks in parallel.
+
+    Yields (path, sheet, arrow_file) as batches finish; sheets of one
+    workbook are spread over the pool so large workbooks scale with cores.
+    """
+    loop = asyncio.get_running_loop()
+    jobs = {}
+    unclaimed = []  # (path, sheet, file) of finished batches not yielded yet
+    if EXCEL_WORKERS <= 1:
+        try:
+            for path in paths:
+                # Parsing still blocks, so keep it off the event loop
+                sheets = await asyncio.to_thread(sheet_names, path, engine)
+                outputs = await asyncio.to_thread(read_sheets, path, sheets, engine, out_dir)
+                unclaimed += [(path, sheet, out) for sheet, out in outputs]
+                while unclaimed:
+                    yield unclaimed.pop(0)
+        finally:
+            for _, _, out in unclaimed:
+                _remove(out)
+        return
+
+    pool = executor()
+    try:
+        for path in paths:
+            sheets = await asyncio.to_thread(sheet_names, path, engine)
+            for i in range(min(EXCEL_WORKERS, len(sheets))):
+                batch = sheets[i::EXCEL_WORKERS]
+                job = pool.submit(read_sheets, path, batch, engine, out_dir)
+                jobs[asyncio.wrap_future(job, loop=loop)] = (path, job)
+        pending = set(jobs)
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for future in done:
+                path, _ = jobs.pop(future)
+                unclaimed += [(path, sheet, out) for sheet, out in future.result()]
+            while unclaimed:
+                yield unclaimed.pop(0)
+    finally:
+        # Stopped early (error or cancellation): remove the files nobody will
+        # ingest, including those of batches that are still being parsed
+        for _, _, out in unclaimed:
+            _remove(out)
+        for _, job in jobs.values():
+            if not job.cancel():
+                job.add_done_callback(_remove_outputs)
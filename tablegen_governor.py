@@ -0,0 +1,74 @@
+import asyncio
+import os
+import re
+import tempfile
+
+import duckdb
+
+# DuckDB applies these to a whole database; every worker process has its own
+# catalog database, so they bound what one worker's queries can take together
+QUERY_MEMORY_LIMIT = os.getenv("TABLEGEN_QUERY_MEMORY_LIMIT", "2GB")
+QUERY_THREADS = int(os.getenv("TABLEGEN_QUERY_THREADS", 0)) or min(4, os.cpu_count() or 1)
+# Large sorts, joins and aggregates spill here instead of failing on the memory limit
+QUERY_TEMP_DIR = os.getenv("TABLEGEN_QUERY_TEMP_DIR") or os.path.join(tempfile.gettempdir(), "tablegen_duckdb_tmp")
+QUERY_TIMEOUT = float(os.getenv("TABLEGEN_QUERY_TIMEOUT", 30))
+# Plans where any operator is estimated to produce more rows are rejected up front
+MAX_ESTIMATED_ROWS = int(os.getenv("TABLEGEN_MAX_ESTIMATED_ROWS", 500_000_000))
+
+# Cardinality estimates in EXPLAIN output: 'EC: 123' (older DuckDB) or '~123 Rows'
+ESTIMATE = re.compile(r"EC:\s*(\d+)|~([\d,]+)\s+Rows?")
+
+
+class QueryRejected(Exception):
+    """The query plan is estimated to be too expensive to run"""
+
+
+class QueryTimeout(Exception):
+    """The query ran longer than its time budget and was interrupted"""
+
+
+def duckdb_config() -> dict:
+    """Connection config for a governed catalog database"""
+    os.makedirs(QUERY_TEMP_DIR, exist_ok=True)
+    return {
+        "memory_limit": QUERY_MEMORY_LIMIT,
+        "threads": QUERY_THREADS,
+        "temp_directory": QUERY_TEMP_DIR,
+    }
+
+
+def estimated_rows(conn: duckdb.DuckDBPyConnection, sql: str) -> int:
+    """Largest per-operator cardinality estimate in the query plan"""
+    plan = "\n".join(row[1] for row in conn.execute(f"EXPLAIN {sql}").fetchall())
+    estimates = [int((a or b).replace(",", "")) for a, b in ESTIMATE.findall(plan)]
+    return max(estimates, default=0)
+
+
+def check_cost(conn: duckdb.DuckDBPyConnection, sql: str, max_rows: int = MAX_ESTIMATED_ROWS):
+    """Reject queries whose plan (e.g. an accidental cross join) is estimated to explode"""
+    rows = estimated_rows(conn, sql)
+    if rows > max_rows:
+        raise QueryRejected(
+            f"Query rejected: the plan is estimated to produce {rows:,} rows "
+            f"(limit {max_rows:,}); add join conditions or filters"
+        )
+
+
+async def run_query(conn: duckdb.DuckDBPyConnection, fn, *args, timeout: float = QUERY_TIMEOUT):
+    """Run fn(conn, *args) in a thread, interrupting `conn` when it takes too long.
+
+    `conn` should be a cursor of its own: interrupting it cancels the
+    running DuckDB query and frees its threads and memory, and the event
+    loop stays free while the query runs. The query is also interrupted
+    when the request is cancelled (e.g. the client went away).
+    """
+    task = asyncio.ensure_future(asyncio.to_thread(fn, conn, *args))
+    try:
+        return await asyncio.wait_for(asyncio.shield(task), timeout)
+    except asyncio.TimeoutError:
+        conn.interrupt()
+        await asyncio.gather(task, return_exceptions=True)
+        raise QueryTimeout(f"Query interrupted after {timeout:g}s")
+    except asyncio.CancelledError:
+        conn.interrupt()
+        raise
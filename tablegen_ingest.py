@@ -0,0 +1,211 @@
+import asyncio
+import os
+import re
+import tempfile
+
+import duckdb
+import pandas as pd
+import pyarrow as pa
+from fastapi import UploadFile
+
+from tablegen_excel import EXCEL_ENGINE, to_arrow, load_arrow, parse_workbooks
+
+# Uploads are copied to disk in fixed-size chunks so memory use does not
+# depend on the file size; DuckDB then reads the spool file directly.
+CHUNK_SIZE = 1 << 20
+SPOOL_DIR = os.getenv("TABLEGEN_SPOOL_DIR") or None
+
+CSV_SUFFIXES = ('.csv', '.csv.gz')
+PARQUET_SUFFIXES = ('.parquet', '.pq')
+EXCEL_SUFFIXES = ('.xls', '.xlsx')
+SUPPORTED_SUFFIXES = CSV_SUFFIXES + PARQUET_SUFFIXES + EXCEL_SUFFIXES
+
+
+def file_suffix(filename: str) -> str:
+    """Return the supported suffix of a filename (e.g. '.csv.gz')"""
+    lower = filename.lower()
+    for suffix in sorted(SUPPORTED_SUFFIXES, key=len, reverse=True):
+        if lower.endswith(suffix):
+            return suffix
+    raise ValueError(f"Unsupported file format: {filename}")
+
+
+def base_name(filename: str) -> str:
+    """Filename without its (possibly compound) suffix"""
+    return filename[:-len(file_suffix(filename))]
+
+
+def quote_ident(name: str) -> str:
+    """Quote a table or column name for DuckDB"""
+    return '"' + name.replace('"', '""') + '"'
+
+
+def sql_literal(value: str) -> str:
+    return "'" + value.replace("'", "''") + "'"
+
+
+async def spool_upload(file: UploadFile) -> str:
+    """Copy an upload to a temporary file chunk by chunk and return its path"""
+    suffix = file_suffix(file.filename)
+    fd, path = tempfile.mkstemp(suffix=suffix, dir=SPOOL_DIR)
+    try:
+        with os.fdopen(fd, 'wb') as out:
+            while chunk := await file.read(CHUNK_SIZE):
+                out.write(chunk)
+    except Exception:
+        os.remove(path)
+        raise
+    return path
+
+
+def replace_table(conn: duckdb.DuckDBPyConnection, table_name: str, select_sql: str):
+    """(Re)create a catalog table from a SELECT, replacing a spilled view of the same name"""
+    table = quote_ident(table_name)
+    conn.execute(f"DROP VIEW IF EXISTS {table}")
+    conn.execute(f"CREATE OR REPLACE TABLE {table} AS {select_sql}")
+
+
+def create_table_from_arrow(conn: duckdb.DuckDBPyConnection, table_name: str, table: pa.Table,
+                            create=replace_table):
+    """Materialize an Arrow table in DuckDB without an intermediate copy"""
+    view = f"__arrow_{re.sub(r'[^0-9A-Za-z_]', '_', table_name)}"
+    conn.register(view, table)
+    try:
+        create(conn, table_name, f"SELECT * FROM {quote_ident(view)}")
+    finally:
+        conn.unregister(view)
+
+
+def ingest_file(conn: duckdb.DuckDBPyConnection, path: str, filename: str,
+                sheet_prefix: str = None, create=replace_table) -> list[str]:
+    """Load a spooled upload into the DuckDB catalog and return the new table names.
+
+    `create(conn, table_name, select_sql)` stores each table; by default it
+    becomes a table in `conn`, the shared catalog writes Parquet instead.
+    """
+    suffix = file_suffix(filename)
+    name = base_name(filename)
+
+    if suffix in CSV_SUFFIXES:
+        # read_csv_auto detects gzip compression from the '.gz' extension
+        create(conn, name, f"SELECT * FROM read_csv_auto({sql_literal(path)})")
+        return [name]
+
+    if suffix in PARQUET_SUFFIXES:
+        create(conn, name, f"SELECT * FROM read_parquet({sql_literal(path)})")
+        return [name]
+
+    # Excel has no native DuckDB reader: parse with pandas and hand the
+    # sheets over as Arrow so DuckDB scans the buffers in place.
+    # ingest_uploads parses sheets in a process pool instead.
+    prefix = sheet_prefix or name
+    tables = []
+    with pd.ExcelFile(path, engine=EXCEL_ENGINE) as xls:
+        for sheet_name in xls.sheet_names:
+            table_name = f"{prefix}_{sheet_name}"
+            create_table_from_arrow(conn, table_name, to_arrow(xls.parse(sheet_name)), create)
+            tables.append(table_name)
+    return tables
+
+
+async def _off_loop(conn: duckdb.DuckDBPyConnection, load, *args):
+    """Run a blocking `load(cursor, *args)` in a thread, on a cursor of its own"""
+    cursor = conn.cursor()
+
+    def run():
+        try:
+            return load(cursor, *args)
+        finally:
+            cursor.close()
+    return await asyncio.to_thread(run)
+
+
+def _discard(path: str):
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+
+def ingest_arrow_file(conn: duckdb.DuckDBPyConnection, table_name: str, arrow_path: str,
+                      create=replace_table):
+    """Create a table from a parsed sheet's IPC file and remove the file"""
+    try:
+        create_table_from_arrow(conn, table_name, load_arrow(arrow_path), create)
+    finally:
+        os.remove(arrow_path)
+
+
+async def ingest_upload(conn: duckdb.DuckDBPyConnection, file: UploadFile,
+                        sheet_prefix: str = None, create=replace_table) -> list[str]:
+    """Spool an upload to disk, ingest it and remove the spool file"""
+    path = await spool_upload(file)
+    try:
+        # DuckDB reads the whole file; keep that off the event loop
+        return await _off_loop(conn, ingest_file, path, file.filename, sheet_prefix, create)
+    finally:
+        os.remove(path)
+
+
+async def ingest_uploads(conn: duckdb.DuckDBPyConnection, files: list[UploadFile],
+                         filename_prefix: bool = False, create=replace_table) -> list[str]:
+    """Ingest several uploads at once and return the new table names.
+
+    CSV/Parquet files are loaded as they arrive; the sheets of all Excel
+    files are parsed together in the process pool and each one is created
+    in the catalog as soon as its batch is done. With `filename_prefix`
+    sheet tables are named after the full filename ('book.xlsx_Sheet1').
+    """
+    tables = []
+    workbooks = {}
+    arrow_paths = set()  # parsed sheets not ingested yet
+    try:
+        for file in files:
+            path = await spool_upload(file)
+            if file_suffix(file.filename) in EXCEL_SUFFIXES:
+                workbooks[path] = file.filename if filename_prefix else base_name(file.filename)
+                continue
+            try:
+                tables += await _off_loop(conn, ingest_file, path, file.filename, None, create)
+            finally:
+                os.remove(path)
+
+        async for path, sheet_name, arrow_path in parse_workbooks(list(workbooks), EXCEL_ENGINE, SPOOL_DIR):
+            arrow_paths.add(arrow_path)
+            table_name = f"{workbooks[path]}_{sheet_name}"
+            await _off_loop(conn, ingest_arrow_file, table_name, arrow_path, create)
+            arrow_paths.discard(arrow_path)
+            tables.append(table_name)
+    finally:
+        for path in workbooks:
+            os.remove(path)
+        for arrow_path in arrow_paths:
+            _discard(arrow_path)
+    return tables
+
+
+def fetch_arrow(conn: duckdb.DuckDBPyConnection, sql: str) -> pa.Table:
+    return conn.execute(sql).arrow()
+
+
+def fetch_df(conn: duckdb.DuckDBPyConnection, sql: str) -> pd.DataFrame:
+    """Run a query and convert the result to pandas through Arrow"""
+    return conn.execute(sql).arrow().to_pandas(split_blocks=True, self_destruct=True)
+
+
+def list_tables(conn: duckdb.DuckDBPyConnection) -> list[str]:
+    return [row[0] for row in conn.execute(
+        "SELECT table_name FROM information_schema.tables "
+        "WHERE table_schema = 'main' ORDER BY table_name"
+    ).fetchall()]
+
+
+def table_columns(conn: duckdb.DuckDBPyConnection) -> dict[str, list[tuple[str, str]]]:
+    """Map each catalog table to its (column, type) pairs"""
+    columns = {}
+    for table_name, column_name, data_type in conn.execute(
+        "SELECT table_name, column_name, data_type FROM information_schema.columns "
+        "WHERE table_schema = 'main' ORDER BY table_name, ordinal_position"
+    ).fetchall():
+        columns.setdefault(table_name, []).append((column_name, data_type))
+    return columns
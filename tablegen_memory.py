@@ -0,0 +1,179 @@
+import logging
+import os
+import tempfile
+import threading
+import time
+import uuid
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+
+import duckdb
+
+from tablegen_ingest import quote_ident, sql_literal
+
+MEMORY_BUDGET_MB = float(os.getenv("TABLEGEN_MEMORY_BUDGET_MB", 2048))
+SESSION_IDLE_TTL = float(os.getenv("TABLEGEN_SESSION_IDLE_TTL", 1800))
+# Number of past edit exchanges kept in each session's conversation memory
+HISTORY_WINDOW = int(os.getenv("TABLEGEN_HISTORY_WINDOW", 10))
+SPILL_DIR = os.getenv("TABLEGEN_SPILL_DIR") or os.path.join(tempfile.gettempdir(), "tablegen_spill")
+# Rows sampled to estimate the in-memory size of a catalog table
+SIZE_SAMPLE_ROWS = 10_000
+
+logger = logging.getLogger(__name__)
+
+
+def _spill_path(key: str) -> str:
+    os.makedirs(SPILL_DIR, exist_ok=True)
+    safe = "".join(c if c.isalnum() else "_" for c in key)
+    return os.path.join(SPILL_DIR, f"{safe}_{uuid.uuid4().hex[:8]}.parquet")
+
+
+def _remove(path: str):
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+
+class Resident(ABC):
+    """Something that holds memory and can be spilled to Parquet when cold"""
+
+    kind = "resident"
+
+    def __init__(self, manager: "MemoryManager", key: str):
+        self.manager = manager
+        self.key = key
+        self.nbytes = 0
+        self.path = None  # set while spilled
+        self.last_access = time.time()
+        # Held by the owner while it uses the resident; the manager only
+        # spills from another thread when it can take it without waiting
+        self.lock = threading.RLock()
+
+    @property
+    def spilled(self) -> bool:
+        return self.path is not None
+
+    @abstractmethod
+    def spill(self):
+        """Write the data out, release it from memory and set `path`"""
+
+    def describe(self) -> dict:
+        return {
+            "kind": self.kind,
+            "bytes": self.nbytes,
+            "spilled": self.spilled,
+            "idle_seconds": round(time.time() - self.last_access, 1),
+        }
+
+
+class CatalogTable(Resident):
+    """A DuckDB table that is swapped for a Parquet-backed view when cold"""
+
+    kind = "table"
+
+    def __init__(self, manager: "MemoryManager", conn: duckdb.DuckDBPyConnection, name: str,
+                 schema: str = "main", lock: threading.RLock = None):
+        super().__init__(manager, f"table:{schema}.{name}")
+        self.conn = conn
+        if lock is not None:
+            # The owner's lock for `conn`: DuckDB cursors must not be used by two threads at once
+            self.lock = lock
+        self.name = name
+        self.qualified = f"{quote_ident(schema)}.{quote_ident(name)}"
+        self.nbytes = estimate_table_bytes(conn, self.qualified)
+
+    def spill(self):
+        path = _spill_path(self.key)
+        table = self.qualified
+        self.conn.execute(f"COPY {table} TO {sql_literal(path)} (FORMAT parquet)")
+        self.conn.execute(f"DROP TABLE {table}")
+        # The view keeps the table queryable straight from the spill file
+        self.conn.execute(f"CREATE VIEW {table} AS SELECT * FROM read_parquet({sql_literal(path)})")
+        self.path = path
+        self.nbytes = 0
+
+    def ensure_loaded(self):
+        if self.path is not None:
+            table = self.qualified
+            self.conn.execute(f"DROP VIEW {table}")
+            self.conn.execute(
+                f"CREATE TABLE {table} AS SELECT * FROM read_parquet({sql_literal(self.path)})"
+            )
+            _remove(self.path)
+            self.path = None
+            self.nbytes = estimate_table_bytes(self.conn, self.qualified)
+        self.manager.touch(self)
+
+    def drop(self):
+        """Remove the table (or its spilled view and file) entirely"""
+        if self.path is not None:
+            self.conn.execute(f"DROP VIEW IF EXISTS {self.qualified}")
+            _remove(self.path)
+            self.path = None
+        else:
+            self.conn.execute(f"DROP TABLE IF EXISTS {self.qualified}")
+        self.manager.forget(self)
+
+
+def estimate_table_bytes(conn: duckdb.DuckDBPyConnection, table: str) -> int:
+    """Approximate in-memory size of a (quoted) table from an Arrow sample"""
+    rows = conn.execute(f"SELECT count(*) FROM {table}").fetchone()[0]
+    if not rows:
+        return 0
+    sample = conn.execute(f"SELECT * FROM {table} LIMIT {SIZE_SAMPLE_ROWS}").arrow()
+    return int(sample.nbytes / max(sample.num_rows, 1) * rows)
+
+
+class MemoryManager:
+    """Global memory budget with LRU spilling of catalog and checkpoint tables"""
+
+    def __init__(self, budget_mb: float = MEMORY_BUDGET_MB):
+        self.budget = int(budget_mb * 1024 * 1024)
+        self._lru = OrderedDict()
+        self._lock = threading.RLock()
+        self.spills = 0
+
+    def touch(self, resident: Resident):
+        """Mark a resident as just used and evict colder ones if over budget"""
+        with self._lock:
+            resident.last_access = time.time()
+            self._lru[resident.key] = resident
+            self._lru.move_to_end(resident.key)
+            self._enforce(keep=resident)
+
+    def forget(self, resident: Resident):
+        with self._lock:
+            self._lru.pop(resident.key, None)
+
+    def resident_bytes(self) -> int:
+        return sum(r.nbytes for r in self._lru.values())
+
+    def _enforce(self, keep: Resident):
+        total = self.resident_bytes()
+        for resident in list(self._lru.values()):
+            if total <= self.budget:
+                break
+            if resident is keep or resident.spilled:
+                continue
+            if not resident.lock.acquire(blocking=False):
+                continue  # its owner is using it (and its connection) right now
+            freed = resident.nbytes
+            try:
+                resident.spill()
+            except Exception as e:
+                logger.warning("Could not spill %s: %s", resident.key, e)
+                continue
+            finally:
+                resident.lock.release()
+            self.spills += 1
+            total -= freed
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "budget_bytes": self.budget,
+                "resident_bytes": self.resident_bytes(),
+                "spills": self.spills,
+                "entries": {key: r.describe() for key, r in self._lru.items()},
+            }
@@ -0,0 +1,181 @@
+import os
+import re
+import threading
+import uuid
+
+import duckdb
+
+from tablegen_ingest import quote_ident, sql_literal
+from tablegen_memory import MemoryManager, CatalogTable
+
+# Materialize the plan after this many un-materialized edit steps
+CHECKPOINT_EVERY = int(os.getenv("TABLEGEN_CHECKPOINT_EVERY", 4))
+# Schema holding plan checkpoints, kept apart from the user tables in 'main'
+PLAN_SCHEMA = "plans"
+
+# {x} / {x:spec} fields of a Python format string
+FORMAT_FIELD = re.compile(r"\{x(:[^{}]*)?\}")
+
+
+def format_expression(column: str, format_string: str) -> str:
+    """Translate a Python `{x:spec}` format string into a vectorized DuckDB format() call"""
+    args = []
+
+    def field(match):
+        args.append(quote_ident(column))
+        return "{" + (match.group(1) or "") + "}"
+
+    fmt = FORMAT_FIELD.sub(field, format_string)
+    leftover = fmt.replace("{{", "").replace("}}", "").replace("{}", "")
+    if re.search(r"\{(?!:)", leftover):
+        raise ValueError(f"Only {{x}} fields are supported in format strings: {format_string}")
+    if not args:
+        return sql_literal(format_string.replace("{{", "{").replace("}}", "}"))
+    return f"format({sql_literal(fmt)}, {', '.join(args)})"
+
+
+def compile_step(action: dict, source: str) -> str:
+    """Wrap `source` (a SQL query) with a single edit action"""
+    kind = action.get("action")
+    if kind == "rename_column":
+        return (f"SELECT * RENAME ({quote_ident(action['old_name'])} AS "
+                f"{quote_ident(action['new_name'])}) FROM ({source})")
+    if kind == "drop_column":
+        return f"SELECT * EXCLUDE ({quote_ident(action['column'])}) FROM ({source})"
+    if kind == "filter_rows":
+        # Conditions used to be pandas expressions; '==' is the common leftover
+        condition = re.sub(r"(?<![<>!=])==(?!=)", "=", action["condition"])
+        return f"SELECT * FROM ({source}) WHERE {condition}"
+    if kind == "format_column":
+        expr = format_expression(action["column"], action["format_string"])
+        return f"SELECT * REPLACE ({expr} AS {quote_ident(action['column'])}) FROM ({source})"
+    raise ValueError(f"Unknown action: {kind}")
+
+
+class EditPlan:
+    """Lazy chain of edit actions on top of a base query.
+
+    Actions are only compiled into nested SQL; nothing runs until results
+    are requested. Every CHECKPOINT_EVERY steps the current state is
+    materialized into a checkpoint table, so undo/redo and long chains
+    restart from the nearest checkpoint instead of the base query.
+    push, sql, columns and checkpoint may reload a spilled checkpoint, so
+    async callers run them through tablegen_governor.run_query.
+    """
+
+    def __init__(self, conn: duckdb.DuckDBPyConnection, base_sql: str,
+                 memory_manager: MemoryManager = None):
+        self.conn = conn
+        self.base_sql = base_sql.strip().rstrip(";")
+        self.memory_manager = memory_manager
+        self.steps: list[dict] = []
+        self.redo_stack: list[dict] = []
+        self._checkpoints: dict[int, CatalogTable | str] = {}
+        self._id = uuid.uuid4().hex[:12]
+        # Guards `conn`; shared with the checkpoint tables so the memory
+        # manager never spills them while this plan is using the cursor
+        self.lock = threading.RLock()
+        conn.execute(f"CREATE SCHEMA IF NOT EXISTS {PLAN_SCHEMA}")
+
+    # ---- building ----
+    def push(self, actions: list[dict]):
+        """Append actions after checking that they compile against the current columns"""
+        with self.lock:
+            sql = self.sql()
+            for action in actions:
+                sql = compile_step(action, sql)
+            self.conn.execute(f"DESCRIBE {sql}")  # binds names/types without running the query
+            # A new branch makes checkpoints past the current position meaningless
+            self._drop_checkpoints(after=len(self.steps))
+            self.steps.extend(actions)
+            self.redo_stack.clear()
+
+    def undo(self, count: int = 1) -> int:
+        count = min(count, len(self.steps))
+        for _ in range(count):
+            self.redo_stack.append(self.steps.pop())
+        return count
+
+    def redo(self, count: int = None) -> int:
+        """Replay undone steps; checkpoints taken before the undo are reused"""
+        count = len(self.redo_stack) if count is None else min(count, len(self.redo_stack))
+        for _ in range(count):
+            self.steps.append(self.redo_stack.pop())
+        return count
+
+    # ---- compiling ----
+    def _latest_checkpoint(self) -> tuple[int, str | None]:
+        usable = [n for n in self._checkpoints if n <= len(self.steps)]
+        if not usable:
+            return 0, None
+        n = max(usable)
+        checkpoint = self._checkpoints[n]
+        if isinstance(checkpoint, CatalogTable):
+            with self.lock:
+                checkpoint.ensure_loaded()
+            return n, self._qualified(checkpoint.name)
+        return n, self._qualified(checkpoint)
+
+    def sql(self) -> str:
+        """Single SQL statement for the current state of the plan"""
+        start, table = self._latest_checkpoint()
+        sql = f"SELECT * FROM {table}" if table else self.base_sql
+        for action in self.steps[start:]:
+            sql = compile_step(action, sql)
+        return sql
+
+    def columns(self) -> list[str]:
+        with self.lock:
+            return [row[0] for row in self.conn.execute(f"DESCRIBE {self.sql()}").fetchall()]
+
+    # ---- materializing ----
+    def checkpoint(self, force: bool = False) -> str:
+        """Materialize the current state if needed and return the SQL to run.
+
+        Without `force` this only happens once CHECKPOINT_EVERY steps piled
+        up on top of the last checkpoint; `force` is used when the same
+        result is about to be read repeatedly (e.g. paging).
+        """
+        with self.lock:
+            start, table = self._latest_checkpoint()
+            pending = len(self.steps) - start
+            if table is not None and pending == 0:
+                return self.sql()
+            if force or pending >= CHECKPOINT_EVERY:
+                n = len(self.steps)
+                name = f"p{self._id}_{n}"
+                self.conn.execute(
+                    f"CREATE OR REPLACE TABLE {self._qualified(name)} AS {self.sql()}"
+                )
+                if self.memory_manager is not None:
+                    resident = CatalogTable(self.memory_manager, self.conn, name, schema=PLAN_SCHEMA,
+                                            lock=self.lock)
+                    self.memory_manager.touch(resident)
+                    self._checkpoints[n] = resident
+                else:
+                    self._checkpoints[n] = name
+            return self.sql()
+
+    def _qualified(self, name: str) -> str:
+        return f"{PLAN_SCHEMA}.{quote_ident(name)}"
+
+    def _drop_checkpoints(self, after: int = -1):
+        with self.lock:
+            for n in [n for n in self._checkpoints if n > after]:
+                checkpoint = self._checkpoints.pop(n)
+                if isinstance(checkpoint, CatalogTable):
+                    checkpoint.drop()
+                else:
+                    self.conn.execute(f"DROP TABLE IF EXISTS {self._qualified(checkpoint)}")
+
+    def close(self):
+        self._drop_checkpoints()
+
+    def describe(self) -> dict:
+        checkpoints = self._checkpoints.values()
+        return {
+            "steps": len(self.steps),
+            "undone": len(self.redo_stack),
+            "checkpoints": sorted(self._checkpoints),
+            "bytes": sum(c.nbytes for c in checkpoints if isinstance(c, CatalogTable)),
+        }
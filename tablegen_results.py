@@ -0,0 +1,141 @@
+import base64
+import hashlib
+import io
+import json
+import os
+
+import duckdb
+import pyarrow as pa
+import pyarrow.csv as pacsv
+import pyarrow.ipc as ipc
+
+from tablegen_cache import TTLCache, result_cache, CACHE_TTL, RESULT_CACHE_MAX_ROWS
+
+PREVIEW_ROWS = int(os.getenv("TABLEGEN_PREVIEW_ROWS", 50))
+PAGE_SIZE = int(os.getenv("TABLEGEN_PAGE_SIZE", 1000))
+MAX_PAGE_SIZE = int(os.getenv("TABLEGEN_MAX_PAGE_SIZE", 50_000))
+STREAM_BATCH_ROWS = int(os.getenv("TABLEGEN_STREAM_BATCH_ROWS", 65_536))
+
+MEDIA_TYPES = {
+    "csv": "text/csv",
+    "ndjson": "application/x-ndjson",
+    "arrow": "application/vnd.apache.arrow.stream",
+}
+
+# SQL behind each cursor; cursors only carry the id, never the SQL itself
+queries = TTLCache(4096, max(CACHE_TTL, 3600))
+
+
+def use_query_store(store):
+    """Share the cursor registry between workers (any object with get/set)"""
+    global queries
+    queries = store
+
+
+class CursorError(ValueError):
+    """Raised for cursors that are malformed, expired or refer to old data"""
+
+
+def register_query(sql: str) -> str:
+    query_id = hashlib.sha256(sql.encode()).hexdigest()[:16]
+    queries.set(query_id, sql)
+    return query_id
+
+
+def encode_cursor(query_id: str, offset: int, version: int) -> str:
+    payload = json.dumps({"q": query_id, "o": offset, "v": version}, separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, version: int) -> tuple[str, str, int]:
+    """Resolve a cursor to (query_id, sql, offset), checking it is still valid"""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded))
+        query_id, offset, cursor_version = payload["q"], int(payload["o"]), payload["v"]
+    except Exception:
+        raise CursorError("Malformed cursor")
+    if cursor_version != version:
+        raise CursorError("Data changed since this cursor was issued; re-run the query")
+    sql = queries.get(query_id)
+    if sql is None:
+        raise CursorError("Cursor expired; re-run the query")
+    return query_id, sql, offset
+
+
+def limit_sql(sql: str, limit: int | None, offset: int = 0) -> str:
+    """Wrap a query so DuckDB only produces the requested window of rows"""
+    inner = sql.strip().rstrip(";")
+    window = f" LIMIT {int(limit)}" if limit is not None else ""
+    return f"SELECT * FROM ({inner}) AS _page{window} OFFSET {int(offset)}"
+
+
+def fetch_page(conn: duckdb.DuckDBPyConnection, sql: str, offset: int, limit: int,
+               version: int, cache: bool = True) -> tuple[pa.Table, bool]:
+    """Fetch rows [offset, offset + limit) and whether more rows follow"""
+    key = (sql, offset, limit, version)
+    page = result_cache.get(key) if cache else None
+    if page is None:
+        # One extra row tells us whether there is a next page
+        page = conn.execute(limit_sql(sql, limit + 1, offset)).arrow()
+        if cache and page.num_rows <= RESULT_CACHE_MAX_ROWS:
+            result_cache.set(key, page)
+    return page.slice(0, limit), page.num_rows > limit
+
+
+def preview_markdown(page, has_more: bool) -> str:
+    """Markdown table for a preview page (Arrow table or DataFrame)"""
+    df = page.to_pandas() if isinstance(page, pa.Table) else page
+    text = df.to_markdown(index=False)
+    if has_more:
+        text += f"\n\n(showing first {len(df)} rows; use the cursor to page or stream the rest)"
+    return text
+
+
+def page_payload(page: pa.Table, next_cursor: str | None) -> dict:
+    return {"rows": page.to_pylist(), "row_count": page.num_rows, "next_cursor": next_cursor}
+
+
+def stream_result(conn: duckdb.DuckDBPyConnection, sql: str, fmt: str, offset: int = 0):
+    """Run `sql` and return a generator of CSV, NDJSON or Arrow IPC chunks.
+
+    The query is executed before the generator is returned so SQL errors
+    surface as a normal HTTP error instead of a truncated stream.
+    """
+    if fmt not in MEDIA_TYPES:
+        raise ValueError(f"Unsupported format: {fmt}")
+    if offset:
+        sql = limit_sql(sql, None, offset)
+    reader = conn.execute(sql).fetch_record_batch(STREAM_BATCH_ROWS)
+    return _encode_batches(reader, fmt)
+
+
+def _encode_batches(reader: pa.RecordBatchReader, fmt: str):
+    if fmt == "arrow":
+        sink = io.BytesIO()
+        with ipc.new_stream(sink, reader.schema) as writer:
+            for batch in reader:
+                writer.write_batch(batch)
+                yield _drain(sink)
+        yield _drain(sink)  # end-of-stream marker
+
+    elif fmt == "csv":
+        sink = io.BytesIO()
+        with pacsv.CSVWriter(sink, reader.schema) as writer:
+            for batch in reader:
+                writer.write_batch(batch)
+                yield _drain(sink)
+        yield _drain(sink)
+
+    else:
+        for batch in reader:
+            yield "".join(
+                json.dumps(row, default=str) + "\n" for row in batch.to_pylist()
+            ).encode()
+
+
+def _drain(sink: io.BytesIO) -> bytes:
+    data = sink.getvalue()
+    sink.seek(0)
+    sink.truncate()
+    return data
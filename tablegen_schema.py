@@ -0,0 +1,215 @@
+import math
+import os
+import re
+import threading
+from collections import Counter
+from dataclasses import asdict, dataclass, field
+
+import duckdb
+
+from tablegen_ingest import quote_ident
+
+SCHEMA_MAX_TABLES = int(os.getenv("TABLEGEN_SCHEMA_MAX_TABLES", 8))
+SCHEMA_MAX_COLUMNS = int(os.getenv("TABLEGEN_SCHEMA_MAX_COLUMNS", 40))
+SAMPLE_ROWS = 1000
+SAMPLE_VALUES = 3
+# Only low-cardinality text columns get example values in the prompt
+SAMPLE_MAX_CARDINALITY = 50
+
+# Field weights for the lexical ranker
+TABLE_WEIGHT = 3.0
+COLUMN_WEIGHT = 2.0
+VALUE_WEIGHT = 1.0
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+STOPWORDS = {
+    "a", "an", "and", "are", "as", "at", "by", "for", "from", "get", "give", "how", "in",
+    "is", "list", "me", "many", "much", "of", "on", "or", "per", "show", "than", "that",
+    "the", "to", "what", "which", "with", "all", "each", "top", "find",
+}
+
+
+def tokenize(text: str) -> list[str]:
+    """Split identifiers and prose into lowercase, lightly stemmed tokens"""
+    text = re.sub(r"([a-z0-9])([A-Z])", r"\1 \2", str(text))
+    tokens = []
+    for token in re.split(r"[^0-9A-Za-z]+", text.lower()):
+        if not token or token in STOPWORDS:
+            continue
+        if len(token) > 3 and token.endswith("s") and not token.endswith("ss"):
+            token = token[:-1]
+        tokens.append(token)
+    return tokens
+
+
+@dataclass
+class ColumnInfo:
+    name: str
+    dtype: str
+    cardinality: int | None = None
+    samples: list[str] = field(default_factory=list)
+
+    def describe(self, with_types: bool = True) -> str:
+        if not with_types:
+            return self.name
+        detail = self.dtype
+        if self.samples:
+            detail += ", e.g. " + ", ".join(repr(v) for v in self.samples)
+        return f"{self.name} ({detail})"
+
+
+@dataclass
+class TableInfo:
+    name: str
+    row_count: int
+    columns: list[ColumnInfo]
+    terms: Counter = field(default_factory=Counter)
+    length: float = 0.0
+
+    def describe(self, columns: list[ColumnInfo] = None, with_types: bool = True) -> str:
+        columns = self.columns if columns is None else columns
+        return f"Table {self.name} ({', '.join(c.describe(with_types) for c in columns)})"
+
+    def to_dict(self) -> dict:
+        return {
+            "name": self.name,
+            "row_count": self.row_count,
+            "columns": [asdict(c) for c in self.columns],
+            "terms": dict(self.terms),
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "TableInfo":
+        terms = Counter(data["terms"])
+        return cls(data["name"], data["row_count"], [ColumnInfo(**c) for c in data["columns"]],
+                   terms, sum(terms.values()))
+
+
+class SchemaIndex:
+    """Precomputed table/column statistics with a BM25 ranker over them.
+
+    Tables are indexed once at upload time; `context()` then picks only the
+    tables and columns that are relevant to a prompt, so the LLM prompt size
+    stays flat as the catalog grows.
+    """
+
+    def __init__(self):
+        self.tables: dict[str, TableInfo] = {}
+        self._doc_freq = Counter()
+        self._lock = threading.Lock()
+
+    def index_table(self, conn: duckdb.DuckDBPyConnection, table_name: str) -> TableInfo:
+        info = self._profile(conn, table_name)
+        self.add(info)
+        return info
+
+    def add(self, info: TableInfo):
+        """Add a table profiled elsewhere (e.g. by another worker)"""
+        with self._lock:
+            self._drop(info.name)
+            self.tables[info.name] = info
+            self._doc_freq.update(info.terms.keys())
+
+    def remove_table(self, table_name: str):
+        with self._lock:
+            self._drop(table_name)
+
+    def _drop(self, table_name: str):
+        old = self.tables.pop(table_name, None)
+        if old is not None:
+            self._doc_freq.subtract(old.terms.keys())
+
+    def _profile(self, conn: duckdb.DuckDBPyConnection, table_name: str) -> TableInfo:
+        table = quote_ident(table_name)
+        described = conn.execute(f"DESCRIBE {table}").fetchall()
+        columns = [ColumnInfo(name=row[0], dtype=row[1]) for row in described]
+        row_count = conn.execute(f"SELECT count(*) FROM {table}").fetchone()[0]
+
+        if columns:
+            try:
+                counts = conn.execute("SELECT " + ", ".join(
+                    f"approx_count_distinct({quote_ident(c.name)})" for c in columns
+                ) + f" FROM {table}").fetchone()
+                for column, count in zip(columns, counts):
+                    column.cardinality = count
+            except duckdb.Error:
+                pass  # nested types; ranking works without cardinalities
+
+        sample = conn.execute(f"SELECT * FROM {table} LIMIT {SAMPLE_ROWS}").arrow()
+        for column in columns:
+            if column.dtype != "VARCHAR":
+                continue
+            if column.cardinality is not None and column.cardinality > SAMPLE_MAX_CARDINALITY:
+                continue
+            values = []
+            for value in sample.column(column.name).to_pylist():
+                if value is not None and value not in values:
+                    values.append(value)
+                if len(values) == SAMPLE_VALUES:
+                    break
+            column.samples = values
+
+        terms = Counter()
+        for token in tokenize(table_name):
+            terms[token] += TABLE_WEIGHT
+        for column in columns:
+            for token in tokenize(column.name):
+                terms[token] += COLUMN_WEIGHT
+            for value in column.samples:
+                for token in tokenize(value):
+                    terms[token] += VALUE_WEIGHT
+        return TableInfo(table_name, row_count, columns, terms, sum(terms.values()))
+
+    def rank(self, prompt: str) -> list[tuple[TableInfo, float]]:
+        """Tables ordered by BM25 relevance to the prompt"""
+        query = set(tokenize(prompt))
+        with self._lock:
+            tables = list(self.tables.values())
+            doc_freq = dict(self._doc_freq)
+        if not tables:
+            return []
+        n = len(tables)
+        avg_len = sum(t.length for t in tables) / n or 1.0
+
+        scored = []
+        for info in tables:
+            score = 0.0
+            for token in query:
+                tf = info.terms.get(token)
+                if not tf:
+                    continue
+                idf = math.log(1 + (n - doc_freq[token] + 0.5) / (doc_freq[token] + 0.5))
+                norm = BM25_K1 * (1 - BM25_B + BM25_B * info.length / avg_len)
+                score += idf * tf * (BM25_K1 + 1) / (tf + norm)
+            scored.append((info, score))
+        scored.sort(key=lambda item: (-item[1], item[0].name))
+        return scored
+
+    def _select_columns(self, info: TableInfo, query: set[str]) -> list[ColumnInfo]:
+        if len(info.columns) <= SCHEMA_MAX_COLUMNS:
+            return info.columns
+
+        def column_score(column: ColumnInfo) -> float:
+            name_hits = len(query.intersection(tokenize(column.name)))
+            value_hits = sum(len(query.intersection(tokenize(v))) for v in column.samples)
+            # Keys are kept so the model can still write joins
+            lower = column.name.lower()
+            is_key = lower == "id" or lower.endswith("_id") or column.name.endswith("Id")
+            return COLUMN_WEIGHT * name_hits + VALUE_WEIGHT * value_hits + (0.5 if is_key else 0.0)
+
+        ranked = sorted(info.columns, key=column_score, reverse=True)[:SCHEMA_MAX_COLUMNS]
+        keep = {c.name for c in ranked}
+        return [c for c in info.columns if c.name in keep]  # original column order
+
+    def context(self, prompt: str, with_types: bool = True) -> str:
+        """Schema text for the prompt restricted to the most relevant tables/columns"""
+        ranked = self.rank(prompt)
+        if len(ranked) > SCHEMA_MAX_TABLES:
+            relevant = [item for item in ranked if item[1] > 0]
+            # Nothing matched lexically: fall back to the top of the ranking
+            ranked = (relevant or ranked)[:SCHEMA_MAX_TABLES]
+        query = set(tokenize(prompt))
+        return "\n".join(
+            info.describe(self._select_columns(info, query), with_types) for info, _ in ranked
+        )
@@ -0,0 +1,109 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+
+from tablegen_catalog import CATALOG_DIR
+
+
+class SessionConflict(Exception):
+    """Raised when another worker changed the session since it was loaded"""
+
+
+class SessionStore:
+    """Session state in a SQLite file shared by all workers on the box.
+
+    Sessions are stored as JSON with a version number; writes use optimistic
+    concurrency so two workers cannot silently overwrite each other.
+    """
+
+    def __init__(self, path: str = None):
+        self.path = path or os.path.join(CATALOG_DIR, "sessions.sqlite")
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        self._local = threading.local()
+        self.queries = _QueryTable(self)
+
+    def _db(self) -> sqlite3.Connection:
+        # One connection per thread and process; SQLite handles cross-process locking
+        db = getattr(self._local, "db", None)
+        if db is None or self._local.pid != os.getpid():
+            db = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute(
+                "CREATE TABLE IF NOT EXISTS sessions ("
+                "id TEXT PRIMARY KEY, state TEXT NOT NULL, version INTEGER NOT NULL, "
+                "last_seen REAL NOT NULL)"
+            )
+            db.execute(
+                "CREATE TABLE IF NOT EXISTS queries ("
+                "id TEXT PRIMARY KEY, sql TEXT NOT NULL, created REAL NOT NULL)"
+            )
+            self._local.db = db
+            self._local.pid = os.getpid()
+        return db
+
+    def load(self, session_id: str) -> tuple[dict | None, int]:
+        row = self._db().execute(
+            "SELECT state, version FROM sessions WHERE id = ?", (session_id,)
+        ).fetchone()
+        if row is None:
+            return None, 0
+        return json.loads(row[0]), row[1]
+
+    def save(self, session_id: str, state: dict, version: int) -> int:
+        """Store `state` if the session is still at `version`; return the new version"""
+        db = self._db()
+        payload = json.dumps(state)
+        if version == 0:
+            cursor = db.execute(
+                "INSERT OR IGNORE INTO sessions (id, state, version, last_seen) VALUES (?, ?, 1, ?)",
+                (session_id, payload, time.time()),
+            )
+        else:
+            cursor = db.execute(
+                "UPDATE sessions SET state = ?, version = version + 1, last_seen = ? "
+                "WHERE id = ? AND version = ?",
+                (payload, time.time(), session_id, version),
+            )
+        if cursor.rowcount == 0:
+            raise SessionConflict(f"Session {session_id} was modified concurrently; retry")
+        return version + 1
+
+    def touch(self, session_id: str):
+        self._db().execute(
+            "UPDATE sessions SET last_seen = ? WHERE id = ?", (time.time(), session_id)
+        )
+
+    def delete(self, session_id: str):
+        self._db().execute("DELETE FROM sessions WHERE id = ?", (session_id,))
+
+    def expire(self, idle_ttl: float) -> list[str]:
+        """Delete sessions idle for longer than `idle_ttl` seconds and return their ids"""
+        db = self._db()
+        cutoff = time.time() - idle_ttl
+        expired = [row[0] for row in db.execute(
+            "SELECT id FROM sessions WHERE last_seen < ?", (cutoff,)
+        ).fetchall()]
+        db.execute("DELETE FROM sessions WHERE last_seen < ?", (cutoff,))
+        db.execute("DELETE FROM queries WHERE created < ?", (cutoff,))
+        return expired
+
+
+class _QueryTable:
+    """get/set view of the queries table, used as the shared cursor registry"""
+
+    def __init__(self, store: SessionStore):
+        self.store = store
+
+    def get(self, query_id: str, default=None):
+        row = self.store._db().execute(
+            "SELECT sql FROM queries WHERE id = ?", (query_id,)
+        ).fetchone()
+        return row[0] if row else default
+
+    def set(self, query_id: str, sql: str):
+        self.store._db().execute(
+            "INSERT OR REPLACE INTO queries (id, sql, created) VALUES (?, ?, ?)",
+            (query_id, sql, time.time()),
+        )
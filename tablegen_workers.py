@@ -0,0 +1,39 @@
+import multiprocessing
+import os
+
+import uvicorn
+
+WORKERS = int(os.getenv("TABLEGEN_WORKERS", 1))
+
+
+def _serve(config: uvicorn.Config, sock):
+    uvicorn.Server(config).run(sockets=[sock])
+
+
+def serve(app, host: str = "0.0.0.0", port: int = 8000, workers: int = WORKERS):
+    """Run `app` in `workers` forked processes sharing one listening socket.
+
+    uvicorn's own --workers needs an importable module path; the TableGen
+    apps are plain scripts, so the socket is bound here and handed to each
+    forked worker instead.
+    """
+    config = uvicorn.Config(app, host=host, port=port)
+    if workers <= 1:
+        uvicorn.Server(config).run()
+        return
+
+    sock = config.bind_socket()
+    ctx = multiprocessing.get_context("fork")
+    processes = [ctx.Process(target=_serve, args=(config, sock)) for _ in range(workers)]
+    for process in processes:
+        process.start()
+    try:
+        for process in processes:
+            process.join()
+    except KeyboardInterrupt:
+        for process in processes:
+            process.terminate()
+        for process in processes:
+            process.join()
+    finally:
+        sock.close()
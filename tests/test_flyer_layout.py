@@ -0,0 +1,50 @@
+import pytest
+
+pytest.importorskip("numpy")
+pytest.importorskip("PIL", minversion="10.1")  # scalable default font
+
+from flyer_layout import break_lines, fit_text, layout_text  # noqa: E402
+from flyer_fonts import get_font  # noqa: E402
+
+# Not installed anywhere: the registry falls back to Pillow's default font
+FONT = "tests-missing-font.ttf"
+TEXT = "Summer Fashion Blowout! Up to 70% off trendsetting styles"
+
+
+def test_fit_text_is_largest_fitting_size():
+    box = (400, 200)
+    layout = fit_text(TEXT, FONT, box)
+    assert layout.fits(*box)
+    bigger = layout_text(TEXT, FONT, layout.size + 1, box[0])
+    assert not bigger.fits(*box)
+
+
+def test_fit_text_clamps_to_size_range():
+    assert fit_text(TEXT, FONT, (5, 5), min_size=8).size == 8
+    assert fit_text("Hi", FONT, (4000, 4000), max_size=60).size == 60
+
+
+def test_break_lines_keeps_words_and_paragraphs():
+    font = get_font(FONT, 30)
+    lines = break_lines("one two three\nfour five", font, 10_000)
+    assert lines == ["one two three", "four five"]
+    wrapped = break_lines(TEXT, font, 200)
+    assert len(wrapped) > 1
+    assert " ".join(wrapped).split() == TEXT.split()
+
+
+def test_long_words_are_split_between_characters():
+    font = get_font(FONT, 30)
+    word = "W" * 40
+    lines = break_lines(word, font, 150)
+    assert len(lines) > 1
+    assert "".join(lines) == word
+
+
+def test_alignment_offsets():
+    left = layout_text("Sale", FONT, 40, 500, "left").lines[0]
+    center = layout_text("Sale", FONT, 40, 500, "center").lines[0]
+    right = layout_text("Sale", FONT, 40, 500, "right").lines[0]
+    assert left.x == 0
+    assert center.x == pytest.approx((500 - center.width) / 2)
+    assert right.x == pytest.approx(500 - right.width)
@@ -0,0 +1,74 @@
+import pytest
+
+pytest.importorskip("requests")
+pytest.importorskip("httpx")
+pytest.importorskip("openai")
+
+from llm_cache import CacheMiss, ResponseCache  # noqa: E402
+from llm_gateway import LLMGateway  # noqa: E402
+
+MESSAGES = [{"role": "user", "content": "Summer sale flyer"}]
+
+
+def test_record_then_replay(tmp_path):
+    ResponseCache(tmp_path, "record").record("chat", "gpt", MESSAGES, {"temperature": 0}, "hello")
+    replay = ResponseCache(tmp_path, "replay")
+    assert replay.lookup("chat", "gpt", MESSAGES, {"temperature": 0}) == "hello"
+    assert replay.stats()["hits"] == 1
+
+
+def test_replay_miss_raises(tmp_path):
+    with pytest.raises(CacheMiss):
+        ResponseCache(tmp_path, "replay").lookup("chat", "gpt", MESSAGES, {})
+
+
+def test_bypass_never_touches_disk(tmp_path):
+    cache = ResponseCache(tmp_path, "bypass")
+    assert cache.record("chat", "gpt", MESSAGES, {}, "hello") == "hello"
+    assert cache.lookup("chat", "gpt", MESSAGES, {}) is None
+    assert not any(tmp_path.iterdir())
+
+
+def test_cached_calls_through_once(tmp_path):
+    cache = ResponseCache(tmp_path, "record")
+    calls = []
+
+    def call():
+        calls.append(1)
+        return "fresh"
+
+    assert cache.cached("chat", "gpt", MESSAGES, {}, call) == "fresh"
+    assert cache.cached("chat", "gpt", MESSAGES, {}, call) == "fresh"
+    assert len(calls) == 1
+
+
+def test_unknown_mode(tmp_path):
+    with pytest.raises(ValueError):
+        ResponseCache(tmp_path, "sometimes")
+
+
+def test_gateway_replays_recorded_responses(tmp_path):
+    recorder = LLMGateway(backend="stub", cache=ResponseCache(tmp_path, "record"))
+    try:
+        recorded = recorder.chat_sync("gpt", MESSAGES)
+    finally:
+        recorder.close()
+
+    replayer = LLMGateway(backend="stub", cache=ResponseCache(tmp_path, "replay"))
+    try:
+        assert replayer.chat_sync("gpt", MESSAGES) == recorded
+        assert replayer.stats()["backend_calls"] == 0
+        with pytest.raises(CacheMiss):
+            replayer.chat_sync("gpt", MESSAGES + [{"role": "user", "content": "new"}])
+    finally:
+        replayer.close()
+
+
+def test_gateway_without_cache():
+    # TableGen's shared gateway has no cache, so replay runs never affect it
+    gateway = LLMGateway(backend="stub")
+    try:
+        assert gateway.chat_sync("gpt", MESSAGES).startswith("Stub response")
+        assert gateway.stats()["cache"] is None
+    finally:
+        gateway.close()
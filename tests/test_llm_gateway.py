@@ -0,0 +1,77 @@
+import asyncio
+import json
+
+import pytest
+
+pytest.importorskip("httpx")
+pytest.importorskip("openai")
+
+from llm_gateway import LLMGateway, request_key  # noqa: E402
+
+MESSAGES = [{"role": "user", "content": "Summer sale flyer"}]
+
+
+@pytest.fixture
+def gateway():
+    gateway = LLMGateway(backend="stub")
+    yield gateway
+    gateway.close()
+
+
+def slow(gateway, latency=0.3):
+    """Give the stub backend a latency so concurrent calls overlap"""
+    gateway.set_stub_responder(None)  # starts the loop and the backend
+    gateway.backend.latency = latency
+
+
+def test_request_key_ignores_param_order():
+    assert request_key("chat", "m", MESSAGES, {"a": 1, "b": 2}) == request_key("chat", "m", MESSAGES, {"b": 2, "a": 1})
+    assert request_key("chat", "m", MESSAGES, {}) != request_key("image", "m", MESSAGES, {})
+
+
+def test_stub_is_deterministic(gateway):
+    first = gateway.chat_sync("gpt", MESSAGES)
+    assert first == gateway.chat_sync("gpt", MESSAGES)
+    assert first != gateway.chat_sync("gpt", MESSAGES + [{"role": "user", "content": "again"}])
+    assert gateway.image_sync("dall-e-3", "a beach") == gateway.image_sync("dall-e-3", "a beach")
+
+
+def test_stub_json_response(gateway):
+    text = gateway.chat_sync("gpt", MESSAGES, response_format={"type": "json_object"})
+    assert set(json.loads(text)) == {"headline", "subtext", "position"}
+
+
+def test_stub_responder(gateway):
+    gateway.set_stub_responder(lambda model, messages, params: "SELECT 1")
+    assert gateway.chat_sync("gpt", MESSAGES) == "SELECT 1"
+
+
+def test_identical_calls_are_coalesced(gateway):
+    slow(gateway)
+
+    async def both():
+        return await asyncio.gather(gateway.chat("gpt", MESSAGES), gateway.chat("gpt", MESSAGES))
+
+    first, second = asyncio.run(both())
+    assert first == second
+    stats = gateway.stats()
+    assert stats["backend_calls"] == 1
+    assert stats["coalesced"] == 1
+    assert stats["in_flight"] == 0
+
+
+def test_cancelled_caller_does_not_fail_followers(gateway):
+    slow(gateway)
+
+    async def run():
+        leader = asyncio.ensure_future(gateway.chat("gpt", MESSAGES))
+        await asyncio.sleep(0.05)
+        follower = asyncio.ensure_future(gateway.chat("gpt", MESSAGES))
+        await asyncio.sleep(0.05)
+        leader.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await leader
+        return await follower
+
+    assert asyncio.run(run()).startswith("Stub response")
+    assert gateway.stats()["backend_calls"] == 1